@@ -0,0 +1,45 @@
+# Making a smaller BDF font, with only the glyphs a game uses, on a computer
+# Runs with CPython, not on the PyPortal:
+#     python3 font_subset.py fonts/SairaStencilOne-Regular-17.bdf fonts/SairaStencilOne-Regular-17-ui.bdf "characters"
+# bitmap_font searches the whole file for the glyphs each label needs, a file with only the used glyphs
+# is searched much faster, and takes less room on the drive
+# The glyphs are copied as they are, the font renders exactly the same
+
+import sys
+
+
+def subset_font(source_path, target_path, chars):
+    codes = set(ord(char) for char in chars)
+    header = []
+    glyphs = []
+    with open(source_path) as source:
+        glyph = None
+        for line in source:
+            if line.startswith("STARTCHAR"):
+                glyph = [line]
+            elif glyph is not None:
+                glyph.append(line)
+                if line.startswith("ENDCHAR"):
+                    code = int([entry for entry in glyph if entry.startswith("ENCODING")][0].split()[1])
+                    if code in codes:
+                        glyphs.append(glyph)
+                        codes.discard(code)
+                    glyph = None
+            elif line.startswith("CHARS "):
+                header.append(None)  # glyph count, known only at the end
+            elif not line.startswith("ENDFONT"):
+                header.append(line)
+
+    with open(target_path, "w") as target:
+        for line in header:
+            target.write("CHARS {}\n".format(len(glyphs)) if line is None else line)
+        for glyph in glyphs:
+            target.writelines(glyph)
+        target.write("ENDFONT\n")
+    return (len(glyphs), "".join(sorted(chr(code) for code in codes)))
+
+if __name__ == "__main__":
+    (count, missing) = subset_font(sys.argv[1], sys.argv[2], sys.argv[3])
+    print("{} glyphs written".format(count))
+    if missing:
+        print("not in the font:", repr(missing))
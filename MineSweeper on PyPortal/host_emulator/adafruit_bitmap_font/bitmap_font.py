@@ -0,0 +1,79 @@
+# Host stand-in for the adafruit_bitmap_font library
+# Reads BDF fonts from the emulated drive, glyphs are loaded only when asked for, like on the board
+
+from collections import namedtuple
+import displayio
+import emulator
+
+Glyph = namedtuple("Glyph", ["bitmap", "tile_index", "width", "height", "dx", "dy", "shift_x", "shift_y"])
+
+
+class BDF:
+    def __init__(self, path):
+        self.path = emulator.host_path(path)
+        self._glyphs = {}
+        self._bounding_box = (0, 0, 0, 0)
+        with open(self.path) as font_file:
+            for line in font_file:
+                if line.startswith("FONTBOUNDINGBOX"):
+                    self._bounding_box = tuple(int(word) for word in line.split()[1:5])
+                elif line.startswith("STARTCHAR"):
+                    break
+
+    # (width, height, x offset, y offset) of the whole font
+    def get_bounding_box(self):
+        return self._bounding_box
+
+    # Loading the glyphs for a string, a code point, or a list of code points, in a single pass over the file
+    def load_glyphs(self, code_points):
+        if isinstance(code_points, int):
+            code_points = (code_points,)
+        elif isinstance(code_points, str):
+            code_points = [ord(char) for char in code_points]
+        missing = set(code for code in code_points if code not in self._glyphs)
+        if not missing:
+            return
+
+        with open(self.path) as font_file:
+            code = None
+            y = None  # row of the glyph bitmap being read
+            for line in font_file:
+                words = line.split()
+                if not words:
+                    continue
+                if words[0] == "ENCODING":
+                    code = int(words[1])
+                    y = None
+                elif code not in missing:
+                    continue
+                elif words[0] == "DWIDTH":
+                    (shift_x, shift_y) = (int(words[1]), int(words[2]))
+                elif words[0] == "BBX":
+                    (width, height, dx, dy) = (int(word) for word in words[1:5])
+                    bitmap = displayio.Bitmap(width, height, 2)
+                    y = None
+                elif words[0] == "BITMAP":
+                    y = 0
+                elif words[0] == "ENDCHAR":
+                    self._glyphs[code] = Glyph(bitmap, 0, width, height, dx, dy, shift_x, shift_y)
+                    missing.discard(code)
+                    if not missing:
+                        break
+                    code = None
+                elif y is not None and y < height:
+                    row = int(words[0], 16)
+                    bits = 4*len(words[0])
+                    for x in range(width):
+                        if row & (1 << (bits - 1 - x)):
+                            bitmap[x, y] = 1
+                    y += 1
+        for code in missing:
+            self._glyphs[code] = None  # not in the font
+
+    def get_glyph(self, code_point):
+        if code_point not in self._glyphs:
+            self.load_glyphs(code_point)
+        return self._glyphs[code_point]
+
+def load_font(filename, bitmap=None):
+    return BDF(filename)
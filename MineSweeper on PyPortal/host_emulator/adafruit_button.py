@@ -0,0 +1,72 @@
+# Host stand-in for the adafruit_button library
+# Rectangle, rounded rectangle and shadowed styles, with a centered label and a selected look
+
+import displayio
+from adafruit_display_shapes.roundrect import RoundRect
+from adafruit_display_text.bitmap_label import Label
+
+
+class Button(displayio.Group):
+    RECT = 0
+    ROUNDRECT = 1
+    SHADOWRECT = 2
+    SHADOWROUNDRECT = 3
+
+    def __init__(self, *, x, y, width, height, name=None, style=RECT, fill_color=0xFFFFFF, outline_color=0x0,
+                 label=None, label_font=None, label_color=0x0, selected_fill=None, selected_outline=None,
+                 selected_label=None, label_scale=None):
+        super().__init__(x=x, y=y)
+        self.width = width
+        self.height = height
+        self.name = name
+        self.fill_color = fill_color
+        self.outline_color = outline_color
+        self.label_color = label_color
+        # Inverted colors when no selected colors are given, like the library
+        self.selected_fill = selected_fill if selected_fill is not None else (~fill_color) & 0xFFFFFF
+        self.selected_outline = selected_outline if selected_outline is not None else (~outline_color) & 0xFFFFFF
+        self.selected_label = selected_label if selected_label is not None else (~label_color) & 0xFFFFFF
+        self._selected = False
+
+        radius = min(width, height) // 4 if style in (Button.ROUNDRECT, Button.SHADOWROUNDRECT) else 0
+        body_width = width
+        body_height = height
+        if style in (Button.SHADOWRECT, Button.SHADOWROUNDRECT):
+            body_width -= 2
+            body_height -= 2
+            self.append(RoundRect(2, 2, body_width, body_height, radius, fill=outline_color))
+        self.body = RoundRect(0, 0, body_width, body_height, radius, fill=fill_color, outline=outline_color)
+        self.append(self.body)
+
+        self._label = None
+        if label is not None and label_font is not None:
+            self._label = Label(label_font, text=label, color=label_color)
+            self._label.x = (body_width - self._label.width) // 2
+            self._label.y = body_height // 2
+            self.append(self._label)
+
+    @property
+    def label(self):
+        return self._label.text if self._label is not None else None
+
+    @label.setter
+    def label(self, new_label):
+        self._label.text = new_label
+
+    @property
+    def selected(self):
+        return self._selected
+
+    @selected.setter
+    def selected(self, value):
+        if value == self._selected:
+            return
+        self._selected = value
+        self.body.fill = self.selected_fill if value else self.fill_color
+        self.body.outline = self.selected_outline if value else self.outline_color
+        if self._label is not None:
+            self._label.color = self.selected_label if value else self.label_color
+
+    # Whether an (x, y) touch point is on the button
+    def contains(self, point):
+        return self.x <= point[0] <= self.x + self.width and self.y <= point[1] <= self.y + self.height
@@ -0,0 +1,57 @@
+# Host stand-in for the roundrect module of the adafruit_display_shapes library
+# A rounded rectangle drawn once into a bitmap, with a transparent outside, the fill color and the outline color
+
+import displayio
+
+
+class RoundRect(displayio.TileGrid):
+    def __init__(self, x, y, width, height, r, *, fill=None, outline=None, stroke=1):
+        self._palette = displayio.Palette(3)
+        self._palette[0] = 0
+        self._palette.make_transparent(0)
+        shape = displayio.Bitmap(width, height, 3)
+        for py in range(height):
+            for px in range(width):
+                if self._inside(px, py, width, height, r, stroke):
+                    shape[px, py] = 1
+                elif self._inside(px, py, width, height, r, 0):
+                    shape[px, py] = 2
+        super().__init__(shape, pixel_shader=self._palette, x=x, y=y)
+        self.fill = fill
+        self.outline = outline
+
+    # Pixel center inside the rectangle shrunk by inset on each side, with the corners rounded
+    @staticmethod
+    def _inside(px, py, width, height, r, inset):
+        radius = max(r - inset, 0)
+        (center_x, center_y) = (px + 0.5, py + 0.5)
+        if not (inset <= center_x <= width - inset and inset <= center_y <= height - inset):
+            return False
+        nearest_x = min(max(center_x, inset + radius), width - inset - radius)
+        nearest_y = min(max(center_y, inset + radius), height - inset - radius)
+        return (center_x - nearest_x)**2 + (center_y - nearest_y)**2 <= radius**2
+
+    def _set_color(self, index, color):
+        if color is None:
+            self._palette.make_transparent(index)
+        else:
+            self._palette[index] = color
+            self._palette.make_opaque(index)
+
+    @property
+    def fill(self):
+        return self._fill
+
+    @fill.setter
+    def fill(self, color):
+        self._fill = color
+        self._set_color(1, color)
+
+    @property
+    def outline(self):
+        return self._outline
+
+    @outline.setter
+    def outline(self, color):
+        self._outline = color
+        self._set_color(2, color)
@@ -0,0 +1,72 @@
+# Host stand-in for the bitmap_label module of the adafruit_display_text library
+# The whole text is rendered into one bitmap, drawn again only when the text changes
+# x is the left edge of the text, y the middle of the ascent, so the baseline is at y + ascent//2
+
+import displayio
+
+
+class Label(displayio.Group):
+    def __init__(self, font, *, x=0, y=0, text="", color=0xFFFFFF, background_color=None, **kwargs):
+        super().__init__(x=x, y=y)
+        self.font = font
+        self._palette = displayio.Palette(2)
+        self._palette[1] = color
+        self._set_background(background_color)
+        self._text = None
+        self.text = text
+
+    def _set_background(self, background_color):
+        self._background_color = background_color
+        if background_color is None:
+            self._palette[0] = 0
+            self._palette.make_transparent(0)
+        else:
+            self._palette[0] = background_color
+            self._palette.make_opaque(0)
+
+    @property
+    def text(self):
+        return self._text
+
+    @text.setter
+    def text(self, new_text):
+        if new_text == self._text:
+            return
+        self._text = new_text
+        self.font.load_glyphs(new_text)
+        (_, font_height, _, font_y_offset) = self.font.get_bounding_box()
+        ascent = font_height + font_y_offset
+        glyphs = [self.font.get_glyph(ord(char)) for char in new_text]
+        width = max(1, sum(glyph.shift_x for glyph in glyphs if glyph is not None))
+        text_bitmap = displayio.Bitmap(width, font_height, 2)
+        left = 0
+        for glyph in glyphs:
+            if glyph is None:
+                continue
+            top = ascent - glyph.height - glyph.dy
+            for y in range(glyph.height):
+                for x in range(glyph.width):
+                    if glyph.bitmap[x, y] and 0 <= left + glyph.dx + x < width and 0 <= top + y < font_height:
+                        text_bitmap[left + glyph.dx + x, top + y] = 1
+            left += glyph.shift_x
+        self.width = width
+        self.height = font_height
+        if len(self):
+            self.pop()
+        self.append(displayio.TileGrid(text_bitmap, pixel_shader=self._palette, y=ascent//2 - ascent))
+
+    @property
+    def color(self):
+        return self._palette[1]
+
+    @color.setter
+    def color(self, new_color):
+        self._palette[1] = new_color
+
+    @property
+    def background_color(self):
+        return self._background_color
+
+    @background_color.setter
+    def background_color(self, new_color):
+        self._set_background(new_color)
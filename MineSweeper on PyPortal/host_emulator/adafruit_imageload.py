@@ -0,0 +1,36 @@
+# Host stand-in for the adafruit_imageload library
+# Loads palette indexed BMP files, 1, 4 or 8 bits per pixel, uncompressed, from the emulated drive
+
+import struct
+import emulator
+
+
+def load(file_or_filename, *, bitmap=None, palette=None):
+    with open(emulator.host_path(file_or_filename), "rb") as bmp_file:
+        data = bmp_file.read()
+    if data[:2] != b"BM":
+        raise NotImplementedError("only BMP files are loaded by the host emulator")
+    data_start = struct.unpack_from("<I", data, 10)[0]
+    header_size = struct.unpack_from("<I", data, 14)[0]
+    (width, height, _, bits) = struct.unpack_from("<iiHH", data, 18)
+    (compression, _, _, _, colors) = struct.unpack_from("<IIiiI", data, 30)
+    if bits not in (1, 4, 8) or compression != 0:
+        raise NotImplementedError("only uncompressed 1, 4 or 8 bit BMP files are loaded by the host emulator")
+    colors = colors or 1 << bits
+
+    image_palette = None
+    if palette is not None:
+        image_palette = palette(colors)
+        for n in range(colors):
+            (blue, green, red) = data[14 + header_size + 4*n:14 + header_size + 4*n + 3]
+            image_palette[n] = (red << 16) | (green << 8) | blue
+
+    image = bitmap(width, abs(height), colors)
+    row_size = ((width*bits + 31) // 32) * 4  # rows are padded to 4 bytes
+    mask = (1 << bits) - 1
+    for y in range(abs(height)):
+        row = data_start + ((abs(height) - 1 - y) if height > 0 else y)*row_size  # bottom up unless the height is negative
+        for x in range(width):
+            bit = x*bits
+            image[x, y] = (data[row + bit // 8] >> (8 - bits - bit % 8)) & mask
+    return image, image_palette
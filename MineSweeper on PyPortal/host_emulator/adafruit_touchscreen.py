@@ -0,0 +1,25 @@
+# Host stand-in for the adafruit_touchscreen library
+# The touch points come from the script loaded in the emulator, already in screen coordinates,
+# and each reading also runs the display auto refresh, like the background refresh on the board
+
+import board
+import emulator
+
+
+class Touchscreen:
+    def __init__(self, x1_pin, x2_pin, y1_pin, y2_pin, *, x_resistance=None, samples=4, z_threshold=10000,
+                 calibration=None, size=None):
+        self.size = size
+
+    # (x, y, pressure) while the script touches the screen, None otherwise
+    # Raises emulator.ScriptDone once the script is over, to stop the game
+    @property
+    def touch_point(self):
+        board.DISPLAY._auto_refresh_tick()
+        now = emulator.script_ms()
+        if now >= emulator.script_end_ms:
+            raise emulator.ScriptDone()
+        point = emulator.touched(now)
+        if point is None:
+            return None
+        return (point[0], point[1], 20000)
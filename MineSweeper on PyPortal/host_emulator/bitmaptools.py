@@ -0,0 +1,19 @@
+# Host stand-in for the CircuitPython bitmaptools module
+# Only readinto(), with the byte sized elements the sprite sheets use
+
+def readinto(bitmap, file, bits_per_pixel, element_size=1, reverse_pixels_in_element=False,
+             swap_bytes_in_element=False, reverse_rows=False):
+    if element_size != 1 or swap_bytes_in_element:
+        raise NotImplementedError("the host emulator only reads rows of single byte elements")
+    bits = bits_per_pixel
+    row_size = (bitmap.width*bits + 7) // 8
+    mask = (1 << bits) - 1
+    values = bitmap._values
+    for n in range(bitmap.height):
+        row = file.read(row_size)
+        y = bitmap.height - 1 - n if reverse_rows else n
+        for x in range(bitmap.width):
+            bit = x*bits
+            shift = bit % 8 if reverse_pixels_in_element else 8 - bits - bit % 8
+            values[x + y*bitmap.width] = (row[bit // 8] >> shift) & mask
+    bitmap._version += 1
@@ -0,0 +1,11 @@
+# Host stand-in for the CircuitPython board module of the PyPortal Titano
+# The built in display is a host frame buffer, the touch screen pins are only names
+
+import displayio
+
+DISPLAY = displayio.Display(480, 320)
+
+TOUCH_XL = "TOUCH_XL"
+TOUCH_XR = "TOUCH_XR"
+TOUCH_YD = "TOUCH_YD"
+TOUCH_YU = "TOUCH_YU"
@@ -0,0 +1,340 @@
+# Host stand-in for the CircuitPython displayio module
+# Bitmap, Palette, TileGrid and Group behave like the ones on the board, and Display rasterizes the group tree
+# into a frame buffer of 0xRRGGBB pixels
+# Like the real display, only the dirty areas are drawn on each refresh: tile writes, moved, shown or hidden objects,
+# and changed bitmaps or palettes, the number of pixels pushed is kept for each refresh
+# As in displayio, the tiles written in a tile grid grow a single rectangle, a write at each end repaints all between,
+# and overlapping dirty areas are merged, so no pixel is counted twice
+
+import time
+from array import array
+import emulator
+
+
+# ==================== Bitmaps and palettes ====================
+
+class Bitmap:
+    def __init__(self, width, height, value_count):
+        self.width = width
+        self.height = height
+        self.value_count = value_count
+        self._values = array('B' if value_count <= 256 else 'H', bytes(width*height*(1 if value_count <= 256 else 2)))
+        self._version = 0  # changes on every write, tile grids showing the bitmap are redrawn
+
+    def _index(self, key):
+        if isinstance(key, tuple):
+            (x, y) = key
+            if not (0 <= x < self.width and 0 <= y < self.height):
+                raise IndexError("pixel out of bounds")
+            return x + y*self.width
+        return key
+
+    def __getitem__(self, key):
+        return self._values[self._index(key)]
+
+    def __setitem__(self, key, value):
+        if not 0 <= value < self.value_count:
+            raise ValueError("pixel value out of range")
+        self._values[self._index(key)] = value
+        self._version += 1
+
+    def fill(self, value):
+        for i in range(len(self._values)):
+            self._values[i] = value
+        self._version += 1
+
+class Palette:
+    def __init__(self, color_count):
+        self._colors = [0] * color_count
+        self._transparent = [False] * color_count
+        self._version = 0
+
+    def __len__(self):
+        return len(self._colors)
+
+    def __getitem__(self, index):
+        return self._colors[index]
+
+    def __setitem__(self, index, color):
+        if isinstance(color, (tuple, list)):
+            color = (color[0] << 16) | (color[1] << 8) | color[2]
+        self._colors[index] = color & 0xFFFFFF
+        self._version += 1
+
+    def make_transparent(self, index):
+        self._transparent[index] = True
+        self._version += 1
+
+    def make_opaque(self, index):
+        self._transparent[index] = False
+        self._version += 1
+
+    def is_transparent(self, index):
+        return self._transparent[index]
+
+
+# ==================== Drawables ====================
+
+class TileGrid:
+    def __init__(self, bitmap, *, pixel_shader, width=1, height=1, tile_width=None, tile_height=None,
+                 default_tile=0, x=0, y=0):
+        self.bitmap = bitmap
+        self.pixel_shader = pixel_shader
+        self.width = width
+        self.height = height
+        self.tile_width = tile_width or bitmap.width
+        self.tile_height = tile_height or bitmap.height
+        self.x = x
+        self.y = y
+        self.hidden = False
+        self._tiles = array('H', [default_tile] * (width*height))
+        self._columns = bitmap.width // self.tile_width  # tiles on each row of the bitmap
+        self._written = None  # tiles changed since the last refresh, as (left, top, right, bottom) in tiles
+
+    def _index(self, key):
+        if isinstance(key, tuple):
+            (x, y) = key
+            if not (0 <= x < self.width and 0 <= y < self.height):
+                raise IndexError("tile out of bounds")
+            return x + y*self.width
+        return key
+
+    def __getitem__(self, key):
+        return self._tiles[self._index(key)]
+
+    def __setitem__(self, key, tile):
+        index = self._index(key)
+        if self._tiles[index] != tile:
+            self._tiles[index] = tile
+            (x, y) = (index % self.width, index // self.width)
+            if self._written is None:
+                self._written = (x, y, x + 1, y + 1)
+            else:
+                (left, top, right, bottom) = self._written
+                self._written = (min(left, x), min(top, y), max(right, x + 1), max(bottom, y + 1))
+
+    # Area covered on the screen, as (left, top, right, bottom), for a tile grid placed at screen_x, screen_y
+    def _area(self, screen_x, screen_y):
+        return (screen_x, screen_y, screen_x + self.width*self.tile_width, screen_y + self.height*self.tile_height)
+
+    # Everything that changes the whole area of the tile grid, compared between refreshes
+    def _state(self):
+        return (id(self.bitmap), self.bitmap._version, id(self.pixel_shader), self.pixel_shader._version,
+                self.width, self.height)
+
+    # Screen area around the tiles written since the last refresh, none or a single rectangle
+    def _written_areas(self, screen_x, screen_y):
+        if self._written is None:
+            return []
+        (left, top, right, bottom) = self._written
+        self._written = None
+        return [(screen_x + left*self.tile_width, screen_y + top*self.tile_height,
+                 screen_x + right*self.tile_width, screen_y + bottom*self.tile_height)]
+
+    # Drawing the part of the tile grid inside an area, one run of pixels from a single tile at a time
+    def _paint(self, frame, frame_width, screen_x, screen_y, area):
+        (x0, y0, x1, y1) = area
+        tile_width = self.tile_width
+        tile_height = self.tile_height
+        values = self.bitmap._values
+        bitmap_width = self.bitmap.width
+        colors = self.pixel_shader._colors
+        transparent = self.pixel_shader._transparent
+        opaque = not any(transparent)
+        for py in range(y0, y1):
+            ly = py - screen_y
+            tile_row = (ly // tile_height)*self.width
+            offset_y = ly % tile_height
+            px = x0
+            while px < x1:
+                lx = px - screen_x
+                tile = self._tiles[tile_row + lx // tile_width]
+                run = min(tile_width - lx % tile_width, x1 - px)
+                start = (tile % self._columns)*tile_width + lx % tile_width + \
+                        ((tile // self._columns)*tile_height + offset_y)*bitmap_width
+                target = px + py*frame_width
+                if opaque:
+                    frame[target:target + run] = array('I', [colors[value] for value in values[start:start + run]])
+                else:
+                    for n in range(run):
+                        value = values[start + n]
+                        if not transparent[value]:
+                            frame[target + n] = colors[value]
+                px += run
+
+
+# ==================== Groups ====================
+
+class Group:
+    def __init__(self, *, scale=1, x=0, y=0):
+        if scale != 1:
+            raise NotImplementedError("the host emulator only draws groups with scale 1")
+        self.scale = scale
+        self.x = x
+        self.y = y
+        self.hidden = False
+        self._children = []
+
+    def append(self, layer):
+        self._children.append(layer)
+
+    def insert(self, index, layer):
+        self._children.insert(index, layer)
+
+    def index(self, layer):
+        return self._children.index(layer)
+
+    def pop(self, index=-1):
+        return self._children.pop(index)
+
+    def remove(self, layer):
+        self._children.remove(layer)
+
+    def __len__(self):
+        return len(self._children)
+
+    def __getitem__(self, index):
+        return self._children[index]
+
+    def __setitem__(self, index, layer):
+        self._children[index] = layer
+
+    def __delitem__(self, index):
+        del self._children[index]
+
+    def __iter__(self):
+        return iter(self._children)
+
+
+# ==================== Display ====================
+
+class Display:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.rotation = 0
+        self.brightness = 1.0
+        self.auto_refresh = True
+        self.framebuffer = array('I', bytes(4*width*height))  # 0xRRGGBB pixels, row by row
+        # One entry for each refresh: (scripted action running, dirty areas, pixels pushed, milliseconds to draw)
+        self.frames = []
+        self.on_refresh = None  # called with the display after each refresh, for saving the frames
+        self._root = None
+        self._shown = {}  # drawables at the last refresh: id -> (drawable, area on the screen, state, visible)
+        self._last_refresh = 0
+
+    def show(self, group):
+        self._root = group
+
+    @property
+    def root_group(self):
+        return self._root
+
+    # Drawables in the group tree, bottom to top, with their position on the screen and their visibility
+    def _layers(self, group, screen_x, screen_y, visible, layers):
+        for layer in group:
+            x = screen_x + layer.x
+            y = screen_y + layer.y
+            if isinstance(layer, Group):
+                self._layers(layer, x, y, visible and not layer.hidden, layers)
+            else:
+                layers.append((layer, x, y, visible and not layer.hidden))
+        return layers
+
+    # Drawing the dirty areas, returns True like the real refresh
+    def refresh(self, *, target_frames_per_second=60, minimum_frames_per_second=1):
+        start = time.perf_counter()
+        layers = self._layers(self._root, 0, 0, not self._root.hidden, []) if self._root is not None else []
+
+        # Finding the dirty areas, by comparing with the last refresh
+        dirty = []
+        shown = {}
+        for (layer, x, y, visible) in layers:
+            area = layer._area(x, y)
+            state = layer._state()
+            before = self._shown.get(id(layer))
+            written = layer._written_areas(x, y)
+            if before is None:
+                if visible:
+                    dirty.append(area)
+            elif before[1] != area or before[2] != state or before[3] != visible:
+                if before[3]:
+                    dirty.append(before[1])
+                if visible:
+                    dirty.append(area)
+            elif visible:
+                dirty.extend(written)
+            shown[id(layer)] = (layer, area, state, visible)
+        for (key, before) in self._shown.items():
+            if key not in shown and before[3]:
+                dirty.append(before[1])  # removed from the tree
+        self._shown = shown
+
+        # Drawing each area, clipped to the screen, from the bottom layer to the top one
+        # Overlapping areas are merged into their bounding rectangle, until none overlap
+        areas = []
+        for (x0, y0, x1, y1) in dirty:
+            area = (max(x0, 0), max(y0, 0), min(x1, self.width), min(y1, self.height))
+            if area[0] >= area[2] or area[1] >= area[3]:
+                continue
+            merged = True
+            while merged:
+                merged = False
+                for other in areas:
+                    if other[0] < area[2] and area[0] < other[2] and other[1] < area[3] and area[1] < other[3]:
+                        areas.remove(other)
+                        area = (min(area[0], other[0]), min(area[1], other[1]),
+                                max(area[2], other[2]), max(area[3], other[3]))
+                        merged = True
+                        break
+            areas.append(area)
+        pixels = 0
+        frame = self.framebuffer
+        for area in areas:
+            (x0, y0, x1, y1) = area
+            pixels += (x1 - x0)*(y1 - y0)
+            blank = array('I', bytes(4*(x1 - x0)))
+            for py in range(y0, y1):
+                frame[x0 + py*self.width:x1 + py*self.width] = blank
+            for (layer, x, y, visible) in layers:
+                if not visible:
+                    continue
+                (left, top, right, bottom) = layer._area(x, y)
+                clip = (max(x0, left), max(y0, top), min(x1, right), min(y1, bottom))
+                if clip[0] < clip[2] and clip[1] < clip[3]:
+                    layer._paint(frame, self.width, x, y, clip)
+
+        milliseconds = 1000*(time.perf_counter() - start)
+        self.frames.append((emulator.current_action(), areas, pixels, milliseconds))
+        if self.on_refresh is not None:
+            self.on_refresh(self)
+        # The scripted touches wait for the drawing, slow on the host
+        emulator.pause(1000*(time.perf_counter() - start))
+        self._last_refresh = time.monotonic()
+        return True
+
+    # Auto refresh, about 60 times a second while enabled, run from the touch screen readings
+    def _auto_refresh_tick(self):
+        if self.auto_refresh and time.monotonic() - self._last_refresh >= 1/60:
+            self.refresh()
+
+    # Frame buffer as a NumPy array of 8 bit RGB pixels, height x width x 3, needs NumPy on the host
+    def to_array(self):
+        import numpy
+        pixels = numpy.array(self.framebuffer, dtype=numpy.uint32).reshape((self.height, self.width))
+        return numpy.stack(((pixels >> 16) & 0xFF, (pixels >> 8) & 0xFF, pixels & 0xFF), axis=-1).astype(numpy.uint8)
+
+    # Saving the frame buffer as a PNG file, with PIL if it's there, with only zlib otherwise
+    def save_png(self, path):
+        try:
+            from PIL import Image
+        except ImportError:
+            emulator.write_png(path, self.width, self.height, self.framebuffer)
+            return
+        rgb = bytearray()
+        for color in self.framebuffer:
+            rgb += bytes(((color >> 16) & 0xFF, (color >> 8) & 0xFF, color & 0xFF))
+        Image.frombytes("RGB", (self.width, self.height), bytes(rgb)).save(path)
+
+def release_displays():
+    pass
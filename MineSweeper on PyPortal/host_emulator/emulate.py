@@ -0,0 +1,105 @@
+# Running a PyPortal game on a computer, with CPython, no board needed
+#     python3 host_emulator/emulate.py [options] minesweeper.py touches.txt
+# The modules in this folder stand in for displayio, vectorio, bitmaptools, board, adafruit_touchscreen, supervisor
+# and the libraries the game uses, the game itself runs unchanged, reading the scripted touches from the touch script
+# Once the script is over, or the game reloads for another code file, the display numbers are printed:
+# refreshes, pixels pushed to the screen, host drawing time, and the pixels for each scripted action
+#     --png FILE      saves the last frame
+#     --frames DIR    saves every refreshed frame, as DIR/frame0000.png, ...
+#     --nvm FILE      keeps microcontroller.nvm in a file between runs, for resuming saved games
+#     --writable      lets the game write to its folder, like a drive remounted by boot.py
+
+import os
+import sys
+import runpy
+import argparse
+import builtins
+
+HOSTFOLDER = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HOSTFOLDER)
+
+import emulator
+
+
+# open() for the game and the modules it imports, absolute paths are on the emulated drive,
+# unless they start with a folder the host has, like /tmp, so the host files can still be opened
+# The emulated drive is read only for the code by default
+def drive_open(writable, host_open=builtins.open):
+    def open_on_drive(path, mode="r", *args, **kwargs):
+        if isinstance(path, str) and path.startswith("/") and not os.path.exists("/" + path.split("/")[1]):
+            if not writable and any(flag in mode for flag in "wax+"):
+                raise OSError(30, "Read-only filesystem")
+            path = emulator.host_path(path)
+        return host_open(path, mode, *args, **kwargs)
+    return open_on_drive
+
+def report(display, actions):
+    frames = display.frames
+    if not frames:
+        print("no refresh")
+        return
+    pixels = sum(frame[2] for frame in frames)
+    milliseconds = [frame[3] for frame in frames]
+    screen = display.width*display.height
+    print("{} refreshes, {} pixels pushed, {:.1f} screens".format(len(frames), pixels, pixels/screen))
+    print("host drawing: {:.1f} ms mean, {:.1f} ms max per refresh".format(
+        sum(milliseconds)/len(frames), max(milliseconds)))
+
+    # The refreshes done while each scripted action was running, until the next one
+    print("action                         refreshes      pixels")
+    print("{:<30} {:>9} {:>11}".format("startup", *counted(frames, -1)))
+    for n, action in enumerate(actions):
+        print("{:<30} {:>9} {:>11}".format(action, *counted(frames, n)))
+    if actions:
+        print("{:.0f} pixels per action".format(sum(counted(frames, n)[1] for n in range(len(actions)))/len(actions)))
+
+def counted(frames, action):
+    selected = [frame for frame in frames if frame[0] == action]
+    return (len(selected), sum(frame[2] for frame in selected))
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs a PyPortal game on the host, with scripted touches")
+    parser.add_argument("game", help="code file of the game, its folder stands in for the CIRCUITPY drive")
+    parser.add_argument("script", help="touch script: tap X Y, longpress X Y, drag X1 Y1 X2 Y2, wait MS")
+    parser.add_argument("--png", help="saves the last frame to this file")
+    parser.add_argument("--frames", help="saves every refreshed frame in this folder")
+    parser.add_argument("--nvm", help="keeps microcontroller.nvm in this file")
+    parser.add_argument("--writable", action="store_true", help="lets the game write to its folder")
+    options = parser.parse_args()
+
+    game = os.path.abspath(options.game)
+    emulator.drive = os.path.dirname(game)
+    with open(options.script) as script_file:
+        lines = [line.split("#")[0].strip() for line in script_file]
+    emulator.load_touch_script(lines)
+    actions = [line for line in lines if line and not line.startswith("wait")]
+
+    import board
+    import microcontroller
+    if options.nvm and os.path.exists(options.nvm):
+        with open(options.nvm, "rb") as nvm_file:
+            saved = nvm_file.read()
+        microcontroller.nvm[0:len(saved)] = saved
+    if options.frames:
+        os.makedirs(options.frames, exist_ok=True)
+        board.DISPLAY.on_refresh = lambda display: display.save_png(
+            os.path.join(options.frames, "frame{:04d}.png".format(len(display.frames) - 1)))
+
+    sys.path.insert(1, emulator.drive)
+    builtins.open = drive_open(options.writable)
+    try:
+        runpy.run_path(game, run_name="__main__")
+    except emulator.ScriptDone:
+        print("touch script done")
+    except emulator.Reload:
+        print("reload, next code file:", emulator.next_code_file)
+
+    if options.nvm:
+        with open(options.nvm, "wb") as nvm_file:
+            nvm_file.write(microcontroller.nvm)
+    if options.png:
+        board.DISPLAY.save_png(options.png)
+    report(board.DISPLAY, actions)
+
+if __name__ == "__main__":
+    main()
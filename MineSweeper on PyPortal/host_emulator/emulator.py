@@ -0,0 +1,129 @@
+# Shared state of the host emulator: the emulated CIRCUITPY drive, the scripted touches, and the PNG writer
+# The other modules in this folder stand in for the CircuitPython modules and libraries with the same names,
+# emulate.py puts this folder first on the import path and runs a game with them
+
+import os
+import time
+import zlib
+import struct
+
+# Folder standing in for the CIRCUITPY drive, absolute paths like "/fonts/..." are found there
+drive = os.getcwd()
+
+# Scripted touches, as (start ms, end ms, x, y), times counted from the first touch screen reading
+touch_timeline = []
+action_starts = []  # start time of each scripted action, refreshes are counted for the action running
+script_end_ms = 0  # the game is stopped once the script is over
+script_start_ns = None
+paused_ms = 0  # time spent drawing on the host, left out of the script time
+
+# Time between scripted actions, and how long each kind of action lasts, in milliseconds
+GAPMS = 300  # longer than the touch release debounce
+TAPMS = 100
+LONGPRESSMS = 800
+DRAGMS = 400
+DRAGSTEPS = 20
+TAILMS = 1500  # time left after the last action, for the cascades and the refreshes to finish
+
+# Raised by the touch screen when the script is over, it stops the game's event loop
+class ScriptDone(Exception):
+    pass
+
+# Raised by supervisor.reload(), the code file to run next is kept in next_code_file
+class Reload(Exception):
+    pass
+
+next_code_file = None
+
+
+# Host path of a file on the emulated drive
+def host_path(path):
+    if path.startswith("/"):
+        return os.path.join(drive, path[1:])
+    return path
+
+# Reading a touch script, one action per line, blank lines and # comments are ignored:
+#     tap X Y
+#     longpress X Y
+#     drag X1 Y1 X2 Y2
+#     wait MS
+def load_touch_script(lines):
+    global script_end_ms
+    touch_timeline.clear()
+    action_starts.clear()
+    now = GAPMS
+    for line in lines:
+        words = line.split("#")[0].split()
+        if not words:
+            continue
+        action = words[0]
+        numbers = [int(word) for word in words[1:]]
+        if action == "wait":
+            now += numbers[0]
+            continue
+        action_starts.append(now)
+        if action == "tap":
+            touch_timeline.append((now, now + TAPMS, numbers[0], numbers[1]))
+            now += TAPMS
+        elif action == "longpress":
+            touch_timeline.append((now, now + LONGPRESSMS, numbers[0], numbers[1]))
+            now += LONGPRESSMS
+        elif action == "drag":
+            (x1, y1, x2, y2) = numbers
+            step_ms = DRAGMS // DRAGSTEPS
+            for step in range(DRAGSTEPS + 1):
+                touch_timeline.append((now, now + step_ms,
+                                       x1 + (x2 - x1)*step//DRAGSTEPS, y1 + (y2 - y1)*step//DRAGSTEPS))
+                now += step_ms
+        else:
+            raise ValueError("unknown touch script action: " + action)
+        now += GAPMS
+    script_end_ms = now + TAILMS
+
+# Milliseconds since the first touch screen reading, without the time spent drawing
+def script_ms():
+    global script_start_ns
+    if script_start_ns is None:
+        script_start_ns = time.monotonic_ns()
+    return (time.monotonic_ns() - script_start_ns) // 1000000 - int(paused_ms)
+
+# Leaving a slow host refresh out of the script time, so the scripted touches aren't missed or cut short
+def pause(milliseconds):
+    global paused_ms
+    if script_start_ns is not None:
+        paused_ms += milliseconds
+
+# Position touched at a time in the script, or None
+def touched(now):
+    for (start, end, x, y) in touch_timeline:
+        if start <= now < end:
+            return (x, y)
+    return None
+
+# Index of the scripted action running now, -1 before the first one
+def current_action():
+    if script_start_ns is None:
+        return -1
+    now = script_ms()
+    action = -1
+    for n, start in enumerate(action_starts):
+        if start <= now:
+            action = n
+    return action
+
+# Writing 0xRRGGBB pixels, row by row, as an 8 bit RGB PNG, with only zlib
+def write_png(path, width, height, pixels):
+    rows = bytearray()
+    for y in range(height):
+        rows.append(0)  # no filter
+        for color in pixels[y*width:(y+1)*width]:
+            rows += bytes(((color >> 16) & 0xFF, (color >> 8) & 0xFF, color & 0xFF))
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    with open(path, "wb") as png_file:
+        png_file.write(b"\x89PNG\r\n\x1a\n")
+        png_file.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        png_file.write(chunk(b"IDAT", zlib.compress(bytes(rows), 6)))
+        png_file.write(chunk(b"IEND", b""))
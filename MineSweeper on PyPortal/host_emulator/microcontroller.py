@@ -0,0 +1,4 @@
+# Host stand-in for the CircuitPython microcontroller module
+# nvm is a plain bytearray with the size of the PyPortal one, emulate.py can keep it in a file between runs
+
+nvm = bytearray(8192)
@@ -0,0 +1,22 @@
+# Host stand-in for the CircuitPython supervisor module
+# A reload stops the running game, the emulator reports the code file that would run next
+
+import time
+import emulator
+
+
+class _Runtime:
+    serial_connected = True
+    serial_bytes_available = 0
+
+runtime = _Runtime()
+
+def set_next_code_file(filename, *, reload_on_success=False, reload_on_error=False, sticky_on_success=False,
+                       sticky_on_error=False, sticky_on_reload=False):
+    emulator.next_code_file = filename
+
+def reload():
+    raise emulator.Reload()
+
+def ticks_ms():
+    return (time.monotonic_ns() // 1000000) & 0x3FFFFFFF
@@ -0,0 +1,4 @@
+# Host stand-in for the CircuitPython terminalio module
+# The built in font isn't drawn by the emulator, the games load their own BDF fonts
+
+FONT = None
@@ -0,0 +1,63 @@
+# Host stand-in for the CircuitPython vectorio module
+# Circle and Rectangle shapes, filled with one color of their palette, drawn by the displayio stand-in
+
+from array import array
+
+
+class _Shape:
+    def __init__(self, pixel_shader, color_index, x, y):
+        self.pixel_shader = pixel_shader
+        self.color_index = color_index
+        self.x = x
+        self.y = y
+        self.hidden = False
+
+    def _state(self):
+        return (id(self.pixel_shader), self.pixel_shader._version, self.color_index, self._shape())
+
+    # Shapes have no tiles, any change redraws the whole shape
+    def _written_areas(self, screen_x, screen_y):
+        return []
+
+class Circle(_Shape):
+    # x and y are the center of the circle
+    def __init__(self, *, pixel_shader, radius, x=0, y=0, color_index=0):
+        super().__init__(pixel_shader, color_index, x, y)
+        self.radius = radius
+
+    def _shape(self):
+        return self.radius
+
+    def _area(self, screen_x, screen_y):
+        return (screen_x - self.radius, screen_y - self.radius, screen_x + self.radius + 1, screen_y + self.radius + 1)
+
+    def _paint(self, frame, frame_width, screen_x, screen_y, area):
+        (x0, y0, x1, y1) = area
+        if self.pixel_shader.is_transparent(self.color_index):
+            return
+        color = self.pixel_shader[self.color_index]
+        for py in range(y0, y1):
+            for px in range(x0, x1):
+                if (px - screen_x)**2 + (py - screen_y)**2 <= self.radius**2:
+                    frame[px + py*frame_width] = color
+
+class Rectangle(_Shape):
+    # x and y are the top left corner of the rectangle
+    def __init__(self, *, pixel_shader, width, height, x=0, y=0, color_index=0):
+        super().__init__(pixel_shader, color_index, x, y)
+        self.width = width
+        self.height = height
+
+    def _shape(self):
+        return (self.width, self.height)
+
+    def _area(self, screen_x, screen_y):
+        return (screen_x, screen_y, screen_x + self.width, screen_y + self.height)
+
+    def _paint(self, frame, frame_width, screen_x, screen_y, area):
+        (x0, y0, x1, y1) = area
+        if self.pixel_shader.is_transparent(self.color_index):
+            return
+        row = array('I', [self.pixel_shader[self.color_index]] * (x1 - x0))
+        for py in range(y0, y1):
+            frame[x0 + py*frame_width:x1 + py*frame_width] = row
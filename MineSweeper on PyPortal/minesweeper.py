@@ -1,4 +1,6 @@
 import time
+import os
+import asyncio
 import board
 import displayio
 import vectorio
@@ -10,14 +12,26 @@ from adafruit_display_text.bitmap_label import Label
 from adafruit_button import Button
 from adafruit_display_shapes.roundrect import RoundRect
 import gc
+import binascii
 import supervisor
-from random import seed, randint
-seed(int(time.monotonic()))
+import microcontroller
+from touch_input import TouchInput, LONGPRESS, DRAG
+from small_queue import SmallQueue
+from minesweeper_engine import MinesweeperEngine, RUNNING, WON, NEWTILE, REVEALEDBIT, DIFFICULTIES, LARGECUSTOM, ticks_ms
+from minesweeper_solver import MinesweeperSolver, generate_no_guess
+from minesweeper_probability import ProbabilitySampler
+from minesweeper_save import save_game, read_save, load_save, save_size, SAVEHEADERSIZE
+from minesweeper_log import MoveLog, EXPLORE, FLAG, CHORD
+from sprite_sheet import load_sprite_sheet
+
+startup_start = ticks_ms()  # for the time to the first frame, in debug mode
 
 
 # ==================== Game and UI constants ====================
 
 DEBUGENABLED = False
+LARGEBOARD = False  # large board mode, the board is much bigger than the screen and is panned by dragging
+NOGUESSMODE = False  # only boards that can be solved without guessing, from the first explored tile
 
 BLACK = 0x000000
 WHITE = 0xFFFFFF
@@ -26,31 +40,47 @@ PINK = 0xFF00FF
 RED = 0xFF0000
 
 THEMECOLORS = 5 # number of colors in the game theme palette
-INGROUPXOFFSET = 40  # x position of the play board inside the display group
 INGROUPYOFFSET = 60  # y position of the play board inside the display group
-HTILES = 20  # number of tiles on the horizontal
-VTILES = 12  # number of tiles on the vertical
 TILESIZE = 20 # size of the tile square
-
-# Minesweeper sprite sheet
-ZERO = 0
-ONE = 1
-TWO = 2
-THREE = 3
-FOUR = 4
-FIVE = 5
-SIX = 6
-SEVEN = 7
-EIGHT = 8
-NEWTILE = 9
-EXPLODED = 10
-FLAG = 11
-NOTABOMB = 12
-QUESTION = 13
-BOMB = 14
-
-# Total number of bombs in the game
-NUMBEROFBOMBS = 30
+TOUCHSAMPLERATE = 100 # touch screen readings per second
+DIGSLICECELLS = 24 # number of cells revealed at once by a long flood fill, before checking the time
+DIGSLICEMS = 20 # time given to a long flood fill before letting the other tasks run, in milliseconds
+TOUCHQUEUESIZE = 4 # touch events waiting for the game task, new ones are dropped when full
+RENDERQUEUESIZE = 8 # lists of changed cells waiting for the render task
+NOGUESSBUDGETMS = 2000 # longest time spent looking for a no guess board, the last board tried is kept after that
+PROBABILITYSLICEMS = 20 # time given to the bomb probability sampling between touch events, in milliseconds
+PROBABILITYSAMPLES = 1000 # the sampling stops after this many bomb layouts, until the next explored tile
+MOVELOGSIZE = 1024 # moves kept in the move log, a longer game can't be replayed, but its last moves are kept
+SAVEFILE = "/minesweeper.sav" # game saved here when it doesn't fit in microcontroller.nvm, needs boot.py to make the drive writable
+SPRITEFILE = "/MineSweeperSpriteSheet.spr" # tile icons, made from SPRITEBMPFILE with sprite_convert.py
+SPRITEBMPFILE = "/MineSweeperSpriteSheet.bmp"
+FONTFILE = "/fonts/SairaStencilOne-Regular-17.bdf"
+UIFONTFILE = "/fonts/SairaStencilOne-Regular-17-ui.bdf" # only the glyphs in UICHARS, loaded instead of FONTFILE when found
+# Every character in the UI texts, after changing a text, make UIFONTFILE again on a computer with:
+#     python3 font_subset.py fonts/SairaStencilOne-Regular-17.bdf fonts/SairaStencilOne-Regular-17-ui.bdf "<UICHARS>"
+UICHARS = " !,-0123456789:ABCEGIMNORVYabcdefgilmnoprstuvwx"
+
+# Bomb probability overlay, a colored mark on each tile next to a revealed number,
+# from green for a safe tile to red for a sure bomb
+PROBABILITYCOLORS = (0x00C000, 0x80E000, 0xFFD000, 0xFF8000, RED)
+
+# Difficulty presets, from the engine, the last one is the custom board, bigger in large board mode
+# A long press on "New Game" switches to the next one
+if LARGEBOARD:
+    DIFFICULTIES = DIFFICULTIES[:-1] + (LARGECUSTOM,)
+STARTDIFFICULTY = 3  # the game starts with the custom board
+
+# The game board on the screen is a viewport over the board, at most 20x12 tiles, whatever the board size
+# RAM and redraw costs of the UI stay the same for bigger boards
+MAXVIEWHTILES = 20  # number of tiles on the horizontal, on the screen
+MAXVIEWVTILES = 12  # number of tiles on the vertical, on the screen
+
+# "Bombs left" counter, drawn from a strip of pre-rendered digits
+# Wide enough for the preset with the most bombs, so it doesn't change size with the difficulty
+COUNTERDIGITS = max(2, max(len(str(bombs)) for (_, _, _, bombs) in DIFFICULTIES))  # number of digits shown in the counter
+COUNTERCHARS = "0123456789 -"  # order of the tiles in the digit strip
+BLANKDIGIT = 10
+MINUSDIGIT = 11
 
 
 # ==================== Creating the Minesweeper Game UI ====================
@@ -65,6 +95,10 @@ touch_screen = adafruit_touchscreen.Touchscreen(board.TOUCH_XL, board.TOUCH_XR,
                                       calibration=((7391, 60392), (8696, 56799)),
                                       size=(480, 320))
 
+# Tap, long press and drag events from the touch screen, replacing the fixed sleep after each reading
+# Dragging by a tile size pans the viewport when the board is bigger than the screen, set for each difficulty
+touch_input = TouchInput(touch_screen, sample_rate=TOUCHSAMPLERATE)
+
 # Creating a theme palette for the game
 theme_palette = displayio.Palette(THEMECOLORS)
 theme_palette[0] = LAVENDER
@@ -79,7 +113,18 @@ background_color = displayio.Bitmap(display.width, display.height, THEMECOLORS)
 background = displayio.TileGrid(background_color, pixel_shader=theme_palette)
 
 # Loading the font used in the UI texts
-font = bitmap_font.load_font("/fonts/SairaStencilOne-Regular-17.bdf")
+# bitmap_font searches the file for the glyphs of each new text, so the small subset font is used when it's there,
+# and all the UI glyphs are loaded in a single pass, the labels find them already loaded
+def load_ui_font():
+    try:
+        ui_font = bitmap_font.load_font(UIFONTFILE)
+    except OSError:
+        # No subset font on the drive, the full font renders the same, it's only slower to search
+        ui_font = bitmap_font.load_font(FONTFILE)
+    ui_font.load_glyphs(UICHARS)
+    return ui_font
+
+font = load_ui_font()
 
 # Creating the UI buttons
 new_game_button = Button(x=42, y=10, width=110, height=35,
@@ -91,37 +136,121 @@ main_menu_button = Button(x=328, y=10, width=110, height=35,
                     style=Button.SHADOWROUNDRECT, label="Main Menu", label_font=font)
 
 # Creating the UI text labels
-bomb_number_box = RoundRect(266, 15, 35, 28, 7, fill=WHITE, outline=BLACK, stroke=2)
-
-bomb_number_text_in = Label(font=font, x=273, y=28, text='{:2d}'.format(NUMBEROFBOMBS), color=PINK, background_color=None)
+# The number of bombs left changes on every flag, so instead of a text label that renders the glyphs again each time,
+# the digits are rendered only once, at startup, into a strip of tiles, and the counter is a small tile grid over it
+def render_digit_strip(param_font, color):
+    param_font.load_glyphs(COUNTERCHARS)
+    (_, font_height, _, font_y_offset) = param_font.get_bounding_box()
+    ascent = font_height + font_y_offset  # rows above the baseline
+    digit_width = 0
+    for char in COUNTERCHARS:
+        glyph = param_font.get_glyph(ord(char))
+        if glyph is not None:
+            digit_width = max(digit_width, glyph.shift_x)
+
+    strip = displayio.Bitmap(digit_width * len(COUNTERCHARS), font_height, 2)
+    for tile, char in enumerate(COUNTERCHARS):
+        glyph = param_font.get_glyph(ord(char))
+        if glyph is None:
+            continue
+        # Centering the glyph in its tile, and placing it on the common baseline
+        left = tile*digit_width + (digit_width - glyph.shift_x)//2 + glyph.dx
+        top = ascent - glyph.height - glyph.dy
+        for y in range(glyph.height):
+            for x in range(glyph.width):
+                if glyph.bitmap[x, y] and 0 <= top + y < font_height:
+                    strip[left + x, top + y] = 1
+
+    strip_palette = displayio.Palette(2)
+    strip_palette[0] = BLACK
+    strip_palette.make_transparent(0)
+    strip_palette[1] = color
+    return strip, strip_palette, digit_width, font_height, ascent
+
+digit_strip, digit_palette, DIGITWIDTH, DIGITHEIGHT, DIGITASCENT = render_digit_strip(font, PINK)
+
+# The box around the counter grows with the number of digits
+bomb_number_box = RoundRect(266, 15, 14 + COUNTERDIGITS*DIGITWIDTH, 28, 7, fill=WHITE, outline=BLACK, stroke=2)
+
+# Counter tile grid, the baseline is placed where the text label baseline used to be
+bomb_number_digits = displayio.TileGrid(digit_strip, pixel_shader=digit_palette,
+                            width = COUNTERDIGITS, height = 1,
+                            tile_width = DIGITWIDTH, tile_height = DIGITHEIGHT,
+                            default_tile = BLANKDIGIT,
+                            x = 273, y = 28 + DIGITASCENT//2 - DIGITASCENT)
 
 bomb_number_text_out = Label(font=font, x=170, y=28, text="Bombs left:", color=BLACK, background_color=None)
 
+# Size of the game board on the screen for the current difficulty, centered on the horizontal
+difficulty = STARTDIFFICULTY
+view_htiles = min(DIFFICULTIES[difficulty][1], MAXVIEWHTILES)  # number of tiles on the horizontal, on the screen
+view_vtiles = min(DIFFICULTIES[difficulty][2], MAXVIEWVTILES)  # number of tiles on the vertical, on the screen
+board_x_offset = (display.width - view_htiles*TILESIZE) // 2  # x position of the play board inside the display group
+
 # Creating a rounded rectangle frame for the game board
-game_board_frame = RoundRect(INGROUPXOFFSET-8, INGROUPYOFFSET-8,
-                            HTILES*TILESIZE+16, VTILES*TILESIZE+16, 8, fill=BLACK, outline=PINK, stroke=3)
+def create_game_board_frame():
+    return RoundRect(board_x_offset-8, INGROUPYOFFSET-8,
+                     view_htiles*TILESIZE+16, view_vtiles*TILESIZE+16, 8, fill=BLACK, outline=PINK, stroke=3)
 
-# Loading the .bmp image containing the icons for the game
+game_board_frame = create_game_board_frame()
+
+# Loading the image containing the icons for the game
 # It's a 80x80 pixels image, with icons arranged in a 4x4 grid of squares
-game_sprite_sheet, game_palette = adafruit_imageload.load("/MineSweeperSpriteSheet.bmp",
-                                          bitmap=displayio.Bitmap,
-                                          palette=displayio.Palette)
-
-# Creating a game board as a tile grid
-game_board = displayio.TileGrid(game_sprite_sheet, pixel_shader=game_palette,
-                            width = HTILES,   # number of tiles on the horizontal
-                            height = VTILES,  # number of tiles on the vertical
-                            tile_width = TILESIZE, # each icon is a square 20x20 pixels in size
-                            tile_height = TILESIZE,
-                            default_tile = NEWTILE, # starts with a fully undiscovered board
-                            x = INGROUPXOFFSET,  # position of the game board inside the parent group
-                            y = INGROUPYOFFSET)
-
-# Game Over overlay - hidden by default
-game_over_frame = RoundRect(127, 137, 235, 45, 8, fill=WHITE, outline=BLACK, stroke=3)
-game_over_frame.hidden = True
-game_over_text = Label(font=font, x=140, y=160, text="Congratulations! You win!", color=PINK, background_color=None)
-game_over_text.hidden = True
+# The raw sprite sheet made by sprite_convert.py is read straight into the bitmap,
+# the .bmp file is decoded only when the sprite sheet isn't on the drive
+def load_game_sprites():
+    if DEBUGENABLED:
+        start = ticks_ms()
+    try:
+        sprites = load_sprite_sheet(SPRITEFILE, bitmap=displayio.Bitmap, palette=displayio.Palette)
+    except (OSError, ValueError):
+        sprites = adafruit_imageload.load(SPRITEBMPFILE, bitmap=displayio.Bitmap, palette=displayio.Palette)
+    if DEBUGENABLED:
+        print("sprites loaded in", ticks_ms() - start, "ms")
+    return sprites
+
+game_sprite_sheet, game_palette = load_game_sprites()
+
+# Creating a game board as a tile grid, showing the part of the board inside the viewport
+def create_game_board():
+    return displayio.TileGrid(game_sprite_sheet, pixel_shader=game_palette,
+                              width = view_htiles,   # number of tiles on the horizontal
+                              height = view_vtiles,  # number of tiles on the vertical
+                              tile_width = TILESIZE, # each icon is a square 20x20 pixels in size
+                              tile_height = TILESIZE,
+                              default_tile = NEWTILE, # starts with a fully undiscovered board
+                              x = board_x_offset,  # position of the game board inside the parent group
+                              y = INGROUPYOFFSET)
+
+game_board = create_game_board()
+
+# Bomb probability overlay, a tile grid over the game board, hidden by default
+# Tile 0 is transparent, tile n has a small mark in the top left corner, in the n-th probability color
+probability_marks = displayio.Bitmap(TILESIZE*(len(PROBABILITYCOLORS)+1), TILESIZE, len(PROBABILITYCOLORS)+1)
+for level in range(1, len(PROBABILITYCOLORS)+1):
+    for mark_y in range(2, 8):
+        for mark_x in range(2, 8):
+            probability_marks[level*TILESIZE + mark_x, mark_y] = level
+probability_palette = displayio.Palette(len(PROBABILITYCOLORS)+1)
+probability_palette[0] = BLACK
+probability_palette.make_transparent(0)
+for level, color in enumerate(PROBABILITYCOLORS):
+    probability_palette[level+1] = color
+
+def create_probability_board():
+    return displayio.TileGrid(probability_marks, pixel_shader=probability_palette,
+                              width = view_htiles, height = view_vtiles,
+                              tile_width = TILESIZE, tile_height = TILESIZE,
+                              default_tile = 0,
+                              x = board_x_offset, y = INGROUPYOFFSET)
+
+probability_board = create_probability_board()
+probability_board.hidden = True
+
+# Game Over overlay, also used for the other messages over the board
+# It's built on its first use by show_message(), so it doesn't delay the first frame
+game_over_frame = None
+game_over_text = None
 
 # Dot to test the touch screen
 if DEBUGENABLED:
@@ -135,252 +264,612 @@ minesweeper_group = displayio.Group()
 
 # Adding all the defined elements, in the order they should appear
 minesweeper_group.append(background)
+GAMEBOARDFRAMEINDEX = len(minesweeper_group)  # positions in the group, for replacing the board on a difficulty change
 minesweeper_group.append(game_board_frame)
+GAMEBOARDINDEX = len(minesweeper_group)
 minesweeper_group.append(game_board)
+PROBABILITYINDEX = len(minesweeper_group)
+minesweeper_group.append(probability_board)
 minesweeper_group.append(new_game_button)
 minesweeper_group.append(main_menu_button)
 minesweeper_group.append(bomb_number_box)
-minesweeper_group.append(bomb_number_text_in)
+minesweeper_group.append(bomb_number_digits)
 minesweeper_group.append(bomb_number_text_out)
-minesweeper_group.append(game_over_frame)
-minesweeper_group.append(game_over_text)
+MESSAGEINDEX = len(minesweeper_group)  # position of the overlay, once it's built
 if DEBUGENABLED:
     minesweeper_group.append(test_circle)
 
 display.show(minesweeper_group)
 
+# Pushing the first frame right away, the UI shows up before the game starts
+display.refresh()
+if DEBUGENABLED:
+    print("first frame in", ticks_ms() - startup_start, "ms")
+
 
 # ==================== Defining the game functions ====================
 
-# Only for debugging purposes - printing the generated game board, with bomb locations
-def print_bomb_list():
-    for y in range(VTILES):
-        bomb_string = ""
-        for x in range(HTILES):
-            if bomb_list[x][y] == BOMB:
-                bomb_string = bomb_string + "  " + "*"
-            else:
-                bomb_string = bomb_string + "  " + str(bomb_list[x][y])
-        print(bomb_string)
-    gc.collect()
+# Batching display updates, used as "with display_batch:" around bulk tile and label changes
+# Auto refresh is turned off inside the block, so the screen is not repainted halfway through a loop,
+# and it is refreshed only once, when the outermost block ends
+class DisplayBatch:
+    def __init__(self, param_display):
+        self.display = param_display
+        self.depth = 0  # batches can be nested, only the outermost one refreshes
+        self.auto_refresh = True
+
+    def __enter__(self):
+        if self.depth == 0:
+            self.auto_refresh = self.display.auto_refresh
+            self.display.auto_refresh = False
+        self.depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.depth -= 1
+        if self.depth == 0:
+            self.display.refresh()
+            self.display.auto_refresh = self.auto_refresh
+        return False
 
-# Iterating through all 8 positions around current one (with out of bounds check)
-# Calculating the number of bombs visible from current location
-def get_number_bomb_neighbours(param_x, param_y):
-    num_neighbouring_bombs = 0
-    for x in range( max(0, param_x-1), min(HTILES-1, param_x+1) + 1 ):
-        for y in range( max(0, param_y-1), min(VTILES-1, param_y+1) + 1 ):
-            if (x == param_x) and (y == param_y):
-                continue  # ignore current location
-            if bomb_list[x][y] == BOMB:
-                num_neighbouring_bombs += 1
+display_batch = DisplayBatch(display)
+
+# The game logic, with no display code - the UI only shows the tiles of the cells the engine reports as changed
+engine = MinesweeperEngine(DIFFICULTIES[difficulty][1], DIFFICULTIES[difficulty][2], DIFFICULTIES[difficulty][3])
+# Hint solver, following the engine changes, tapping the "Bombs left" counter asks it for the next certain move
+solver = MinesweeperSolver(engine)
+# Bomb probability estimates, sampled between touch events while the overlay is shown
+# A long press on the "Bombs left" counter shows or hides the overlay
+sampler = ProbabilitySampler(engine, max_samples=PROBABILITYSAMPLES)
+# Every move of the current game, printed when the game is over in debug mode,
+# so the game can be replayed on a computer with minesweeper_replay.py
+move_log = MoveLog(MOVELOGSIZE)
+
+# Value currently shown by the "Bombs left" counter
+bombs_left_shown = None
+
+# Updating the "Bombs left" counter, only the digit tiles that change are written
+# Nothing is done when the value is the same as the one on the screen
+def show_bombs_left():
+    global bombs_left_shown
+    value = engine.bombs_left()
+    if value == bombs_left_shown:
+        return
+    bombs_left_shown = value
+
+    # Too many flags for the counter width, keeping the most negative value that fits, together with the minus sign
+    value = max(value, 1 - 10**(COUNTERDIGITS-1))
+    remaining = abs(value)
+    sign_shown = value >= 0
+    for position in range(COUNTERDIGITS-1, -1, -1):
+        # Filling the digits from right to left, with the minus sign in front of the number
+        if remaining or position == COUNTERDIGITS-1:
+            tile = remaining % 10
+            remaining //= 10
+        elif not sign_shown:
+            tile = MINUSDIGIT
+            sign_shown = True
+        else:
+            tile = BLANKDIGIT
+        if bomb_number_digits[position] != tile:
+            bomb_number_digits[position] = tile
+
+# Position of the viewport on the board, the board cell shown in the top left corner of the game board
+view_x = 0
+view_y = 0
+# Drag distance not yet turned into a viewport move, in pixels
+pan_rest_x = 0
+pan_rest_y = 0
+
+# Render queue item asking for all the tiles in the viewport to be checked, instead of a list of changed cells
+REDRAWVIEWPORT = "viewport"
+
+# Showing the engine changes on the game board
+# Cells outside the viewport are skipped, and only the tiles that differ from what the board already shows are written,
+# every tile write marks an area of the screen to be repainted
+def show_changed_cells(changed):
+    htiles = engine.htiles
+    for i in changed:
+        y = i // htiles - view_y
+        x = i % htiles - view_x
+        if 0 <= x < view_htiles and 0 <= y < view_vtiles:
+            tile = engine.tile(i)
+            if game_board[x, y] != tile:
+                game_board[x, y] = tile
+    show_bombs_left()
+
+# Checking every tile in the viewport, after a new game, a loss, or a viewport move
+# The cost depends only on the viewport size, not on the board size
+def redraw_viewport():
+    for y in range(view_vtiles):
+        row = view_x + (view_y + y)*engine.htiles
+        for x in range(view_htiles):
+            tile = engine.tile(row + x)
+            if game_board[x, y] != tile:
+                game_board[x, y] = tile
+    show_bombs_left()
+
+# Showing the bomb probability estimates on the overlay, for the tiles in the viewport
+# Tiles with no estimate, not next to a revealed number or waiting for the first samples, are left clear
+def redraw_probabilities():
+    levels = len(PROBABILITYCOLORS)
+    for y in range(view_vtiles):
+        row = view_x + (view_y + y)*engine.htiles
+        for x in range(view_htiles):
+            probability = sampler.probability(row + x)
+            tile = 0 if probability is None else 1 + min(int(probability*levels), levels-1)
+            if probability_board[x, y] != tile:
+                probability_board[x, y] = tile
+
+# Moving the viewport by a drag distance in pixels, the board follows the finger
+# Returns True if the viewport moved, and needs to be redrawn
+def pan_viewport(drag_x, drag_y):
+    global view_x, view_y, pan_rest_x, pan_rest_y
+    pan_rest_x += drag_x
+    pan_rest_y += drag_y
+    tiles_x = int(pan_rest_x / TILESIZE)
+    tiles_y = int(pan_rest_y / TILESIZE)
+    pan_rest_x -= tiles_x*TILESIZE
+    pan_rest_y -= tiles_y*TILESIZE
+
+    new_x = min(max(view_x - tiles_x, 0), engine.htiles - view_htiles)
+    new_y = min(max(view_y - tiles_y, 0), engine.vtiles - view_vtiles)
+    if new_x == view_x and new_y == view_y:
+        return False
+    view_x = new_x
+    view_y = new_y
+    return True
 
-    return num_neighbouring_bombs
+# Moving the viewport so a board cell is inside it, centered if it wasn't visible
+# Returns True if the viewport moved, and needs to be redrawn
+def show_cell(index):
+    global view_x, view_y
+    x = index % engine.htiles
+    y = index // engine.htiles
+    if view_x <= x < view_x + view_htiles and view_y <= y < view_y + view_vtiles:
+        return False
+    view_x = min(max(x - view_htiles//2, 0), engine.htiles - view_htiles)
+    view_y = min(max(y - view_vtiles//2, 0), engine.vtiles - view_vtiles)
+    return True
 
-# Starting a new game, initializing all default values, and generating a new game board
-# This function should be run when the file is first loaded, and when "New Game" button is pressed
-def start_new_game():
-    # Hide the game board overlay
-    game_over_frame.hidden = True
-    game_over_text.hidden = True
-
-    # Is the game in progress, False can mean either win or loss
-    global is_game_running
-    is_game_running = True
-
-    # Number of bombs marked as flagged on the game board
-    global flagged_bombs
-    flagged_bombs = 0
-    bomb_number_text_in.text = '{:2d}'.format(NUMBEROFBOMBS - flagged_bombs)
-
-    # Filling the UI game board matrix with the default tiles
-    for x in range(HTILES):
-        for y in range(VTILES):
-            game_board[x,y] = NEWTILE
-
-    # Creating the game data matrix
-    # Keeping same x-y orientation as the UI matrix, for ease of use
-    global bomb_list
-    bomb_list = []
-    for _ in range(HTILES):
-        l = []
-        for _ in range(VTILES):
-            l.append(None)
-        bomb_list.append(l)
-
-    # Planting the bombs
-    bombs_planted = 0
-    while (bombs_planted < NUMBEROFBOMBS):
-        # Choosing a random location
-        random_x = randint(0, HTILES-1)
-        random_y = randint(0, VTILES-1)
-        if bomb_list[random_x][random_y] == BOMB:
-            # Location already contains a bomb, ignore it
-            continue
-        bomb_list[random_x][random_y] = BOMB
-        bombs_planted += 1
+# Switching to another difficulty preset, without reloading the code
+# The engine reuses its buffers when the new board fits in them, and the game board tile grid and frame
+# are only replaced when the size on the screen changes, for example Beginner and Expert need new ones,
+# Expert and the large custom board both fill the screen and share them
+# A new game must be started after this
+def set_difficulty(index):
+    global difficulty, view_htiles, view_vtiles, board_x_offset, game_board, game_board_frame, probability_board
+    global view_x, view_y, pan_rest_x, pan_rest_y
+    difficulty = index
+    (_, htiles, vtiles, bombs) = DIFFICULTIES[index]
+    engine.resize(htiles, vtiles, bombs)
+
+    view_x = 0
+    view_y = 0
+    pan_rest_x = 0
+    pan_rest_y = 0
+    new_view_htiles = min(htiles, MAXVIEWHTILES)
+    new_view_vtiles = min(vtiles, MAXVIEWVTILES)
+    touch_input.drag_step = TILESIZE if (new_view_htiles < htiles or new_view_vtiles < vtiles) else None
+    if new_view_htiles == view_htiles and new_view_vtiles == view_vtiles:
+        return
+
+    view_htiles = new_view_htiles
+    view_vtiles = new_view_vtiles
+    board_x_offset = (display.width - view_htiles*TILESIZE) // 2
+    # Dropping the old tile grid first, so its memory can be reused by the new one
+    minesweeper_group[GAMEBOARDINDEX] = displayio.Group()
+    minesweeper_group[PROBABILITYINDEX] = displayio.Group()
+    probability_hidden = probability_board.hidden
+    game_board = None
+    game_board_frame = None
+    probability_board = None
+    gc.collect()
+    game_board_frame = create_game_board_frame()
+    game_board = create_game_board()
+    probability_board = create_probability_board()
+    probability_board.hidden = probability_hidden
+    minesweeper_group[GAMEBOARDFRAMEINDEX] = game_board_frame
+    minesweeper_group[GAMEBOARDINDEX] = game_board
+    minesweeper_group[PROBABILITYINDEX] = probability_board
+
+# Queues connecting the tasks: touch events go to the game task, changed cells go to the render task
+touch_queue = SmallQueue(TOUCHQUEUESIZE)
+render_queue = SmallQueue(RENDERQUEUESIZE)
+
+# Sending a list of changed cells to the render task, None only asks for a screen refresh
+# All the engine changes pass through here, so the hint solver and the probability sampler follow them too
+async def render(changed=None):
+    if changed is not None and changed != REDRAWVIEWPORT:
+        solver.update(changed)
+        sampler.update(changed)
+    await render_queue.put(changed)
+
+# Showing a message on the overlay over the board, the overlay is built the first time
+def show_message(text, color):
+    global game_over_frame, game_over_text
+    if game_over_frame is None:
+        game_over_frame = RoundRect(127, 137, 235, 45, 8, fill=WHITE, outline=BLACK, stroke=3)
+        game_over_text = Label(font=font, x=140, y=160, text=text, color=color, background_color=None)
+        minesweeper_group.insert(MESSAGEINDEX, game_over_frame)
+        minesweeper_group.insert(MESSAGEINDEX + 1, game_over_text)
+    else:
+        game_over_text.color = color
+        game_over_text.text = text
+        game_over_frame.hidden = False
+        game_over_text.hidden = False
 
-    # Filling the rest of the game matrix with info about the neighbouring bombs
-    for x in range(HTILES):
-        for y in range(VTILES):
-            if bomb_list[x][y] == BOMB:
-                continue
-            bomb_list[x][y] = get_number_bomb_neighbours(x,y)
+def hide_message():
+    if game_over_frame is not None:
+        game_over_frame.hidden = True
+        game_over_text.hidden = True
 
-    if DEBUGENABLED:
-        print_bomb_list()
+def message_shown():
+    return game_over_frame is not None and not game_over_frame.hidden
 
-    # Already explored locations on the board, initialize as empty set
-    global locations_explored
-    locations_explored = set()
+# Seconds since the first explore action of the current game, counted by the timer task
+game_seconds = 0
 
-    gc.collect()
+# Starting a new game, initializing all default values, and clearing the game board
+# The board itself is generated by the engine on the first explore action, so this returns right away
+# This function should be run when the file is first loaded, and when "New Game" button is pressed
+# Passing a game seed recreates a specific board, for benchmarks and bug reports
+async def start_new_game(game_seed=None):
+    global game_seconds
+    game_seconds = 0
 
-# Function called to dig at the selected location - determined by the touch screen reading
-def explore_location(param_x, param_y):
-    global flagged_bombs
+    # Hide the game board overlay
+    hide_message()
 
-    # Adding current location to the set, marking it as already explored
-    locations_explored.add((param_x, param_y))
+    # A new seed is taken from the clock if none is given
+    if game_seed is None:
+        game_seed = time.monotonic_ns() & 0x3FFFFFFF
+    engine.new_game(game_seed)
+    solver.reset()
+    sampler.reset()
+    move_log.clear(game_seed)
 
-    # If current location is a bomb, bad luck, lost the game
-    if bomb_list[param_x][param_y] == BOMB:
-        return False
+    # Filling the UI game board matrix with the default tiles, the render task only writes the ones that changed
+    await render(REDRAWVIEWPORT)
 
-    # Changing the game board to the correct tile
-    game_board[param_x, param_y] = bomb_list[param_x][param_y]
-
-    # If current location is a number > 0, that means there are neighbouring bombs, show the number
-    if bomb_list[param_x][param_y] > 0:
-        return True
-
-    # If location is 0, dig all unexplored neighbours until reaching location next to a bomb
-    # Exploration continues on all other locations with values of 0 to 8, that can be reached from current position
-    dig_stack = [(param_x, param_y)]
-    while dig_stack:
-        (pop_x, pop_y) = dig_stack.pop()
-        for x in range( max(0, pop_x-1), min(HTILES-1, pop_x+1) + 1 ):
-            for y in range( max(0, pop_y-1), min(VTILES-1, pop_y+1) + 1 ):
-                if (x, y) in locations_explored:  # already explored location, ignore
-                    continue
-                if bomb_list[x][y] == BOMB:  # bomb in unexplored location, ignore
-                    continue
-
-                # Add location to the set of explored ones
-                locations_explored.add((x, y))
-
-                # If exploring reveals a tile falsely flagged, update de flagged tiles counter
-                if game_board[x, y] == FLAG:
-                    flagged_bombs -= 1
-                    bomb_number_text_in.text = '{:2d}'.format(NUMBEROFBOMBS-flagged_bombs)
-
-                # Show the discovered tile on the screen
-                game_board[x, y] = bomb_list[x][y]
-
-                if bomb_list[x][y] > 0:
-                    # Location neighbouring bombs, show on board, and ignore after adding to explored locations
-                    continue
-
-                # Location is 0, has no neighbouring bombs, continue exploration
-                dig_stack.append((x, y))
-    gc.collect()
+# Function called to dig at the selected location - determined by the touch screen reading
+# A long flood fill is only started here, and continued in slices by continue_exploring()
+async def explore_location(param_x, param_y):
+    index = param_x + param_y*engine.htiles
+    if engine.cells[index] & REVEALEDBIT:
+        # Tapping a revealed number chords, revealing its neighbours if enough of them are flagged
+        # Only the moves that changed the board are logged, a chord without enough flags does nothing
+        changed = engine.chord(index, DIGSLICECELLS)
+        if changed:
+            move_log.record(index, CHORD)
+        await render(changed)
+        return
+
+    first_explore = not engine.generated
+    if NOGUESSMODE and first_explore:
+        # Trying boards until the solver can clear one from this tile, the game timer starts after this
+        (attempts, milliseconds, solved) = generate_no_guess(engine, solver, index, NOGUESSBUDGETMS)
+        if DEBUGENABLED:
+            print("no guess board:", attempts, "attempts in", milliseconds, "ms, solvable:", solved)
+    changed = engine.explore(index, DIGSLICECELLS)
+    if changed:
+        move_log.record(index, EXPLORE)
+    await render(changed)
+    if first_explore:
+        # The no guess generator can pick another seed, the log keeps the one of the board played
+        move_log.seed = engine.seed
+
+    if DEBUGENABLED and first_explore:
+        print("game seed:", engine.seed)
+        engine.print_board()
+
+# Revealing the next part of a pending flood fill, for at most DIGSLICEMS milliseconds
+# The game task calls this between touch events, so the touch screen and buttons keep working during a long cascade
+async def continue_exploring():
+    deadline = ticks_ms() + DIGSLICEMS
+    while engine.is_digging() and ticks_ms() < deadline:
+        await render(engine.continue_explore(DIGSLICECELLS))
+    if not engine.is_digging():
+        # Cascade finished, the engine has done the win check
+        gc.collect()
+
+# Finishing a pending flood fill, still in slices, before the next move on the board
+# A move made in the middle of a cascade could change how it ends, waiting for it keeps the move log replayable
+async def finish_exploring():
+    while engine.is_digging():
+        await continue_exploring()
+
+# Making the next certain move found by the hint solver: exploring a safe cell, or flagging a bomb
+# When the revealed numbers are not enough, the overlay tells the player to guess
+async def show_hint():
+    if DEBUGENABLED:
+        start = ticks_ms()
+    hint = solver.hint()
+    if DEBUGENABLED:
+        print("hint:", hint, "in", ticks_ms() - start, "ms")
+
+    if hint is None:
+        if engine.generated:
+            show_message("  No sure move, guess!  ", PINK)
+            await render()
+        return
+
+    (index, bomb) = hint
+    if show_cell(index):
+        await render(REDRAWVIEWPORT)
+    if bomb:
+        (action, changed) = (FLAG, engine.flag(index))
+    else:
+        (action, changed) = (EXPLORE, engine.explore(index, DIGSLICECELLS))
+    if changed:
+        move_log.record(index, action)
+    await render(changed)
+
+# Saving the game in progress when leaving for the main menu, so it's resumed on the next start
+# The record goes to microcontroller.nvm when it fits, to SAVEFILE otherwise
+# With no game to keep, an older save is discarded instead, so it isn't resumed,
+# the NVM is flash, it's only written when it holds a save
+def store_game():
+    if DEBUGENABLED:
+        start = ticks_ms()
+    record = save_game(engine, difficulty, game_seconds)
+    if record is None:
+        discard_saved_game()
+        if DEBUGENABLED:
+            print("no game to save")
+        return
+    nvm = microcontroller.nvm
+    if nvm is not None and len(record) <= len(nvm):
+        nvm[0:len(record)] = record
+    else:
+        discard_saved_game()
+        try:
+            with open(SAVEFILE, "wb") as save_file:
+                save_file.write(record)
+        except OSError:
+            # The drive is read only for the code, unless boot.py remounts it
+            if DEBUGENABLED:
+                print("no room to save the game")
+    if DEBUGENABLED:
+        print("game saved:", len(record), "bytes in", ticks_ms() - start, "ms")
+
+# Removing the saved game, a game is only resumed once
+def discard_saved_game():
+    nvm = microcontroller.nvm
+    if nvm is not None and read_save(nvm[0:SAVEHEADERSIZE]) is not None:
+        nvm[0:SAVEHEADERSIZE] = bytes(SAVEHEADERSIZE)
+    try:
+        os.remove(SAVEFILE)
+    except OSError:
+        pass
+
+# Resuming the game saved by store_game(), on its difficulty
+# Returns False when there is no saved game, or the record is from another version or another board
+def resume_game():
+    global game_seconds
+    if DEBUGENABLED:
+        start = ticks_ms()
+    nvm = microcontroller.nvm
+    saved = None
+    if nvm is not None:
+        saved = read_save(nvm[0:SAVEHEADERSIZE])
+    if saved is not None:
+        record = nvm[0:min(len(nvm), save_size(saved[1]*saved[2]))]
+    else:
+        try:
+            with open(SAVEFILE, "rb") as save_file:
+                record = save_file.read()
+        except OSError:
+            return False
+        saved = read_save(record)
+        if saved is None:
+            return False
+
+    (saved_difficulty, htiles, vtiles, bombs, _, seconds, _, _) = saved
+    if saved_difficulty >= len(DIFFICULTIES) or DIFFICULTIES[saved_difficulty][1:] != (htiles, vtiles, bombs):
+        # The presets have changed since the game was saved
+        return False
+    set_difficulty(saved_difficulty)
+    if not load_save(engine, record):
+        return False
+    game_seconds = seconds
+    # The solver and the sampler only know about the cells revealed from now on, all the cells are shown to them
+    solver.reset()
+    solver.update(range(engine.cells_count))
+    sampler.reset()
+    # The moves made before the save are not known, this game can't be replayed
+    move_log.clear(engine.seed)
+    move_log.complete = False
+    discard_saved_game()
+    if DEBUGENABLED:
+        print("game resumed:", len(record), "bytes in", ticks_ms() - start, "ms")
     return True
 
 # Function to be called when game is over, either won or lost
-def game_over(param_x, param_y, win):
-    if win == True:
+async def game_over():
+    if engine.state == WON:
         # Game is won, change the text on the overlay to win
-        game_over_text.color = PINK
-        game_over_text.text="Congratulations! You win!!"
+        message = "  You win in {} seconds!!  ".format(game_seconds)
+        color = PINK
 
     else:
         # Game is lost, show the board, the potential falsely flagged bombs, and the exploded bomb
         # The text on the overlay is changed to lose
-        for x in range(HTILES):
-            for y in range(VTILES):
-                # If the tile was wrongly flagged, show the NOTABOMB icon
-                if (game_board[x,y] == FLAG) and (bomb_list[x][y] != BOMB):
-                    game_board[x,y] = NOTABOMB
-                else:
-                    game_board[x,y] = bomb_list[x][y]
-        game_board[param_x, param_y] = EXPLODED
-        game_over_text.color = RED
-        game_over_text.text="   GAME OVER!  You lose!  "
+        engine.reveal_all()
+        await render(REDRAWVIEWPORT)
+        message = "   GAME OVER!  You lose!  "
+        color = RED
     # Display the overlay, either win or loss
-    game_over_frame.hidden = False
-    game_over_text.hidden = False
+    show_message(message, color)
+    await render()
 
+    if DEBUGENABLED:
+        print("move log, complete:" if move_log.complete else "move log, last moves only:")
+        print(binascii.hexlify(move_log.to_bytes(engine)).decode())
 
-# ==================== Main Loop ====================
+# Handling one touch event, from the touch queue
+async def handle_touch(event):
+    (action, point_x, point_y) = event
+    if DEBUGENABLED:
+        print(" ")
+        print(event)
 
-# Starting new game on UI load
-start_new_game()
+    # Dragging anywhere on the screen pans the viewport, only the tiles inside it are rewritten
+    if action == DRAG:
+        if pan_viewport(point_x, point_y):
+            await render(REDRAWVIEWPORT)
+        return
 
-while True:
-    point = touch_screen.touch_point
-    time.sleep(.2) # touch debounce
+    point = (point_x, point_y)
+    if DEBUGENABLED:
+        test_circle.x = point[0]
+        test_circle.y = point[1]
 
-    if point is not None:
+    # If New Game button is pressed, start a new game
+    # A long press on it switches to the next difficulty first, and shows its name on the overlay
+    if new_game_button.contains(point):
         if DEBUGENABLED:
-            print(" ")
-            print(point)
-            test_circle.x = point[0]
-            test_circle.y = point[1]
-
-        # If New Game button is pressed, start a new game
-        if new_game_button.contains(point):
-            if DEBUGENABLED:
-                print ("new game button")
-            new_game_button.selected = True
-            start_new_game()
-            new_game_button.selected = False
+            print ("new game button")
+        new_game_button.selected = True
+        await render()
+        if action == LONGPRESS:
+            set_difficulty((difficulty + 1) % len(DIFFICULTIES))
+        await start_new_game()
+        if action == LONGPRESS:
+            (name, htiles, vtiles, _) = DIFFICULTIES[difficulty]
+            show_message("     {} {}x{}     ".format(name, htiles, vtiles), PINK)
+        new_game_button.selected = False
+        await render()
+
+    # If Main Menu button is pressed, the code running is changed to code.py
+    if main_menu_button.contains(point):
+        if DEBUGENABLED:
+            print ("main menu button")
+        main_menu_button.selected = True
+        await render()
+        store_game()
+        supervisor.set_next_code_file('code.py')
+        await asyncio.sleep(0.2)
+        supervisor.reload()
+
+    # Tapping the "Bombs left" counter or its label asks for a hint, while the game is running
+    # A long press on it shows or hides the bomb probability overlay
+    if (point[0] in range(bomb_number_text_out.x, bomb_number_box.x + 14 + COUNTERDIGITS*DIGITWIDTH)) and \
+        (point[1] in range(bomb_number_box.y, bomb_number_box.y + 28)):
+        if action == LONGPRESS:
+            probability_board.hidden = not probability_board.hidden
+            await render()
+        elif engine.state == RUNNING:
+            await finish_exploring()
+            await show_hint()
+            if engine.state != RUNNING:
+                await game_over()
+
+    if (point[0] in range( board_x_offset, board_x_offset + view_htiles*TILESIZE)) and \
+        (point[1] in range( INGROUPYOFFSET, INGROUPYOFFSET + view_vtiles*TILESIZE)):
+    # if game_board.contains(point):  # use this after CP 8.0
+
+        # Calculating position on the board, from the position in the viewport
+        xx = view_x + (point[0] - board_x_offset) // TILESIZE
+        yy = view_y + (point[1] - INGROUPYOFFSET) // TILESIZE
+
+        # If the game is not running, ignore touch points on the game board
+        if engine.state == RUNNING:
+            if message_shown():
+                # Hiding the difficulty name shown by the "New Game" button
+                hide_message()
+            await finish_exploring()
+            if action == LONGPRESS:
+                # A long press toggles the flag on an unexplored tile
+                changed = engine.flag(xx + yy*engine.htiles)
+                if changed:
+                    move_log.record(xx + yy*engine.htiles, FLAG)
+                await render(changed)
+            else:
+                # A tap triggers the explore action on that location, flagged or not
+                await explore_location(xx, yy)
 
-        # If Main Menu button is pressed, the code running is changed to code.py
-        if main_menu_button.contains(point):
-            if DEBUGENABLED:
-                print ("main menu button")
-            main_menu_button.selected = True
-            supervisor.set_next_code_file('code.py')
-            time.sleep(0.2)
-            main_menu_button.selected = False
-            supervisor.reload()
-
-        if (point[0] in range( INGROUPXOFFSET, INGROUPXOFFSET + HTILES*TILESIZE)) and \
-            (point[1] in range( INGROUPYOFFSET, INGROUPYOFFSET + VTILES*TILESIZE)):
-        # if game_board.contains(point):  # use this after CP 8.0
-
-            # If the game is not running, ignore touch points on the game board
-            if is_game_running:
-                # Calculating position on the board
-                xx = (point[0] - INGROUPXOFFSET) // TILESIZE
-                yy = (point[1] - INGROUPYOFFSET) // TILESIZE
-
-                if game_board[xx,yy] == NEWTILE:
-                    # When first touched, the tile is marked as flagged
-                    flagged_bombs += 1
-                    game_board[xx,yy] = FLAG
-                    bomb_number_text_in.text = '{:2d}'.format(NUMBEROFBOMBS-flagged_bombs)
-                elif game_board[xx,yy] == FLAG:
-                    # Second tile touch triggers the explore action on that location
-                    flagged_bombs -= 1
-                    bomb_number_text_in.text = '{:2d}'.format(NUMBEROFBOMBS-flagged_bombs)
-                    is_game_running = explore_location(xx, yy)
-
-                if not is_game_running: # Exploration returned false, a bomb has been hit
-                    # LOSE CONDITION:  The game is lost, reveal the board
-                    game_over(xx, yy, False)
-                elif len(locations_explored) == (HTILES*VTILES - NUMBEROFBOMBS):
-                    # WIN CONDITION: All non-bomb locations have been explored, the game is won
-                    is_game_running = False
-                    game_over(xx, yy, True)
+            if engine.state != RUNNING:
+                # The game is over: a bomb has been hit, or all non-bomb locations have been explored
+                await game_over()
 
-            if DEBUGENABLED:
-                print("On the game board")
-                print(xx,yy)
-                # test_circle.x = -10
-                # test_circle.y = -10
-                # print(locations_explored)
-                print(len(locations_explored))
+        if DEBUGENABLED:
+            print("On the game board")
+            print(xx,yy)
+            # test_circle.x = -10
+            # test_circle.y = -10
+            print(engine.explored)
 
 
+# ==================== Main Loop ====================
 
+# Touch sampling task, reads the touch screen at TOUCHSAMPLERATE and never waits on the other tasks
+# If the game task falls behind, new events are dropped instead of blocking the sampling
+async def touch_task():
+    while True:
+        event = touch_input.poll()
+        if event is not None:
+            touch_queue.put_nowait(event)
+        await asyncio.sleep(touch_input.sample_interval)
+
+# Game state task, handles the touch events, and runs pending flood fills and the probability sampling in slices between them
+async def game_task():
+    while True:
+        if engine.is_digging() and touch_queue.empty():
+            await continue_exploring()
+            if engine.state != RUNNING:
+                # All non-bomb locations have been explored by the cascade
+                await game_over()
+            await asyncio.sleep(0)  # let the touch and render tasks run between slices
+            continue
+        if not probability_board.hidden and sampler.sampling() and touch_queue.empty():
+            # Improving the bomb probability estimates while the player thinks, the overlay is updated after each slice
+            sampler.run(PROBABILITYSLICEMS)
+            await render()
+            await asyncio.sleep(0)
+            continue
+        await handle_touch(await touch_queue.get())
+
+# Game timer task, counts the seconds while a game is in progress
+async def timer_task():
+    global game_seconds
+    while True:
+        await asyncio.sleep(1)
+        if engine.generated and engine.state == RUNNING:
+            game_seconds += 1
+            if DEBUGENABLED:
+                print("game time:", game_seconds)
+
+# Rendering task, the only one writing tiles to the screen
+# All the changes waiting in the render queue are applied together, followed by a single refresh
+async def render_task():
+    while True:
+        changed = await render_queue.get()
+        with display_batch:
+            while True:
+                if changed == REDRAWVIEWPORT:
+                    redraw_viewport()
+                elif changed is not None:
+                    show_changed_cells(changed)
+                if render_queue.empty():
+                    break
+                changed = render_queue.get_nowait()
+            if not probability_board.hidden:
+                redraw_probabilities()
+
+async def main():
+    # The render task does all the screen refreshes
+    display.auto_refresh = False
+    # Resuming the game left for the main menu, or starting new game on UI load
+    if resume_game():
+        await render(REDRAWVIEWPORT)
+    else:
+        # Board geometry and drag step for the starting difficulty
+        set_difficulty(difficulty)
+        await start_new_game()
+    await asyncio.gather(asyncio.create_task(touch_task()),
+                         asyncio.create_task(game_task()),
+                         asyncio.create_task(timer_task()),
+                         asyncio.create_task(render_task()))
+
+asyncio.run(main())
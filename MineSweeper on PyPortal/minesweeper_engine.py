@@ -0,0 +1,434 @@
+# Minesweeper game engine, with no display code
+# Runs the same under CircuitPython on the PyPortal and under CPython on a computer, for tests and benchmarks
+# Every action returns the list of cell indices whose tile changed, and the front end redraws only those
+
+import time
+from array import array
+
+# Optional vectorized neighbour counting, with ulab on the PyPortal and NumPy on a computer
+# Without either, or on small boards with NumPy, the bombs update their neighbours one by one
+try:
+    from ulab import numpy as np
+    host_numpy = False
+except ImportError:
+    try:
+        import numpy as np
+        host_numpy = True
+    except ImportError:
+        np = None
+        host_numpy = False
+
+
+# ==================== Engine constants ====================
+
+# Minesweeper sprite sheet, the tile shown for each cell
+ZERO = 0
+ONE = 1
+TWO = 2
+THREE = 3
+FOUR = 4
+FIVE = 5
+SIX = 6
+SEVEN = 7
+EIGHT = 8
+NEWTILE = 9
+EXPLODED = 10
+FLAG = 11
+NOTABOMB = 12
+QUESTION = 13
+BOMB = 14
+
+# Game board cell layout - each cell of the board is packed into a single byte
+COUNTMASK = 0x0F  # lower 4 bits: number of neighbouring bombs, 0 to 8
+BOMBBIT = 0x10  # the cell contains a bomb
+REVEALEDBIT = 0x20  # the cell has been explored
+FLAGGEDBIT = 0x40  # the cell is marked with a flag
+
+# Neighbour table position kinds, as a 4 bit value for each cell
+LEFTOK = 0x01  # there is a column to the left of the cell
+RIGHTOK = 0x02  # there is a column to the right of the cell
+UPOK = 0x04  # there is a row above the cell
+DOWNOK = 0x08  # there is a row below the cell
+
+# Smallest board using the vectorized neighbour counts with NumPy on a computer, in cells
+# There the timings are mixed up to 20x12, the array setup costs about what it saves, and the 30x16 board is faster
+# ulab on the PyPortal doesn't have this threshold, it always uses them
+VECTORIZEDCELLS = 400
+
+# Difficulty presets, as (name, tiles on the horizontal, tiles on the vertical, number of bombs)
+# Shared by the game and the tools on a computer, so the benchmarks always play the boards of the game
+DIFFICULTIES = (("Beginner", 9, 9, 10),
+                ("Intermediate", 16, 16, 40),
+                ("Expert", 30, 16, 99),
+                ("Custom", 20, 12, 30))
+LARGECUSTOM = ("Custom", 100, 100, 1600)  # custom board of the large board mode, much bigger than the screen
+
+# Game states
+RUNNING = 0
+WON = 1
+LOST = 2
+
+
+# ==================== Engine helper functions ====================
+
+# Small xorshift random number generator, returning the next 32 bit state
+# It gives the same sequence on the PyPortal and on a computer, so a game seed always reproduces the same board
+def next_random(state):
+    state ^= (state << 13) & 0xFFFFFFFF
+    state ^= state >> 17
+    state ^= (state << 5) & 0xFFFFFFFF
+    return state
+
+# Milliseconds clock for the time budgets, the same on the PyPortal and on a computer
+def ticks_ms():
+    return time.monotonic_ns() // 1000000
+
+# Neighbour table, built once for the board geometry
+# Each cell stores the kind of board position it's in (corner, edge, inside)
+# The table for a kind holds the index offsets of the neighbours, already clipped at the board edges,
+# so a neighbour of cell i is simply i + offset, with no bounds checks needed
+# The kinds are written into the neighbour_kind buffer, which must have room for htiles*vtiles cells
+def build_neighbour_table(htiles, vtiles, neighbour_kind):
+    for y in range(vtiles):
+        for x in range(htiles):
+            kind = 0
+            if x > 0:
+                kind |= LEFTOK
+            if x < htiles-1:
+                kind |= RIGHTOK
+            if y > 0:
+                kind |= UPOK
+            if y < vtiles-1:
+                kind |= DOWNOK
+            neighbour_kind[x + y*htiles] = kind
+
+    # One tuple of offsets for each of the 16 possible kinds
+    neighbour_offsets = []
+    for kind in range(16):
+        offsets = []
+        for dy in (-1, 0, 1):
+            if (dy < 0 and not kind & UPOK) or (dy > 0 and not kind & DOWNOK):
+                continue
+            for dx in (-1, 0, 1):
+                if (dx < 0 and not kind & LEFTOK) or (dx > 0 and not kind & RIGHTOK):
+                    continue
+                if dx == 0 and dy == 0:
+                    continue  # ignore current location
+                offsets.append(dx + dy*htiles)
+        neighbour_offsets.append(tuple(offsets))
+
+    return neighbour_offsets
+
+
+# ==================== Minesweeper engine ====================
+
+class MinesweeperEngine:
+    def __init__(self, htiles, vtiles, number_of_bombs):
+        # Game data, a flat array with one byte per board cell, row by row
+        # Cell (x, y) is found at index x + y*htiles, and uses the COUNTMASK/BOMBBIT/REVEALEDBIT/FLAGGEDBIT layout
+        # The buffers can be bigger than the board, only the first cells_count cells are used
+        self.cells = bytearray(0)
+        self.neighbour_kind = bytearray(0)
+        # Cell indices used by the bomb placement, reshuffled for every new game
+        self.bomb_candidates = array('H')
+        self.resize(htiles, vtiles, number_of_bombs)
+
+        self.seed = 0  # seed of the current game
+        self.generated = False  # the bombs are only planted on the first explore action
+        self.state = RUNNING
+        self.flagged = 0  # number of cells marked with a flag
+        self.explored = 0  # number of already explored cells
+        self.exploded = -1  # index of the bomb that ended the game
+        self.dig_stack = []  # cells with value 0 whose neighbours are still to be explored
+
+    # Changing the board geometry, for a new difficulty
+    # The buffers are only replaced when the new board is bigger than any board before,
+    # smaller boards reuse them, so switching back and forth doesn't fragment the heap
+    # A new game must be started after this
+    def resize(self, htiles, vtiles, number_of_bombs):
+        cells_count = htiles*vtiles
+        if cells_count > len(self.cells):
+            self.cells = bytearray(cells_count)
+            self.neighbour_kind = bytearray(cells_count)
+            self.bomb_candidates = array('H', range(cells_count))
+        self.htiles = htiles  # number of tiles on the horizontal
+        self.vtiles = vtiles  # number of tiles on the vertical
+        self.cells_count = cells_count
+        self.number_of_bombs = number_of_bombs
+        self.neighbour_offsets = build_neighbour_table(htiles, vtiles, self.neighbour_kind)
+        # Neighbour counts computed with array operations on board generation, with NumPy only on the boards big enough
+        self.vectorized = np is not None and (not host_numpy or cells_count >= VECTORIZEDCELLS)
+
+    # Number of bombs not yet marked with a flag, for the "Bombs left" counter
+    def bombs_left(self):
+        return self.number_of_bombs - self.flagged
+
+    # The tile that should be shown on the screen for a cell
+    def tile(self, index):
+        cell = self.cells[index]
+        if cell & REVEALEDBIT:
+            if cell & BOMBBIT:
+                if index == self.exploded:
+                    return EXPLODED
+                return BOMB
+            return cell & COUNTMASK
+        if cell & FLAGGEDBIT:
+            if self.state == LOST and not (cell & BOMBBIT):
+                # The tile was wrongly flagged
+                return NOTABOMB
+            return FLAG
+        return NEWTILE
+
+    # Placing a bomb on the board, at the cell index
+    # All the neighbours of the bomb get their bomb counter incremented right away,
+    # so there is no need for a second pass over the whole board after the planting
+    # A cell has at most 8 neighbours, so the counter never overflows into the BOMBBIT
+    def plant_bomb(self, index):
+        cells = self.cells
+        cells[index] |= BOMBBIT
+        for offset in self.neighbour_offsets[self.neighbour_kind[index]]:
+            cells[index + offset] += 1
+
+    # Planting all the bombs with a partial Fisher-Yates shuffle of the cell indices
+    # Every bomb takes exactly one random number, no matter how crowded the board is, and no retries are needed
+    # The safe cell and its neighbours never get a bomb, when the board has enough room for that
+    # The same seed and safe cell always give the same board
+    def place_bombs(self, seed, safe_index):
+        candidates = self.bomb_candidates
+        cells_count = self.cells_count
+        safe_offsets = self.neighbour_offsets[self.neighbour_kind[safe_index]]
+        if cells_count - len(safe_offsets) - 1 < self.number_of_bombs:
+            # Crowded board, only the safe cell itself is kept free of bombs
+            safe_offsets = ()
+
+        # Only the cells outside the safe area can be picked
+        free_count = 0
+        for i in range(cells_count):
+            offset = i - safe_index
+            if offset == 0 or offset in safe_offsets:  # the offsets are clipped, so this is exact at the edges too
+                continue
+            candidates[free_count] = i
+            free_count += 1
+
+        state = (seed & 0xFFFFFFFF) or 0x9E3779B9  # xorshift gets stuck on a zero state
+        for i in range(min(self.number_of_bombs, free_count)):
+            state = next_random(state)
+            # Choosing a random location from the ones not picked yet, and moving it to the front
+            j = i + state % (free_count - i)
+            pick = candidates[j]
+            candidates[j] = candidates[i]
+            candidates[i] = pick
+            if not self.vectorized:
+                self.plant_bomb(pick)
+        if self.vectorized:
+            self.count_neighbours(min(self.number_of_bombs, free_count))
+
+    # Planting the first bombs_count candidates at once, the neighbour counts are a 3x3 sum over the bomb mask
+    # The mask has a border of empty cells all around, so the 8 shifted views of it line up with the board,
+    # and the counts for all the cells take 8 array additions, instead of 8 increments for every bomb
+    # Flags placed before the generation are kept
+    def count_neighbours(self, bombs_count):
+        htiles = self.htiles
+        vtiles = self.vtiles
+        candidates = self.bomb_candidates
+        mask = np.zeros((vtiles + 2, htiles + 2), dtype=np.uint8)
+        for i in range(bombs_count):
+            pick = candidates[i]
+            mask[pick // htiles + 1, pick % htiles + 1] = 1
+
+        counts = mask[1:vtiles+1, 1:htiles+1] * BOMBBIT
+        for (dy, dx) in ((0, 0), (0, 1), (0, 2), (1, 0), (1, 2), (2, 0), (2, 1), (2, 2)):
+            counts = counts + mask[dy:dy+vtiles, dx:dx+htiles]
+        counts = np.array(counts.flatten(), dtype=np.uint8).tobytes()
+
+        cells = self.cells
+        if self.flagged:
+            for i in range(self.cells_count):
+                cells[i] |= counts[i]
+        else:
+            cells[0:self.cells_count] = counts
+
+    # Starting a new game, only clearing the board
+    # The bombs are planted later, on the first explore action, so the first explored cell is always safe,
+    # and the generation time is hidden behind the player's first touch
+    # All the tiles go back to NEWTILE, the front end redraws the whole board after this
+    def new_game(self, seed):
+        cells = self.cells
+        for i in range(self.cells_count):
+            cells[i] = 0
+        self.seed = seed
+        self.generated = False
+        self.state = RUNNING
+        self.flagged = 0
+        self.explored = 0
+        self.exploded = -1
+        self.dig_stack.clear()
+
+    # Planting the bombs around the first explored cell, flags placed before that stay on the board
+    def generate(self, safe_index):
+        self.place_bombs(self.seed, safe_index)
+        self.generated = True
+
+    # Placing or removing a flag on an unexplored cell
+    def flag(self, index):
+        cell = self.cells[index]
+        if self.state != RUNNING or (cell & REVEALEDBIT):
+            return []
+        if cell & FLAGGEDBIT:
+            self.flagged -= 1
+        else:
+            self.flagged += 1
+        self.cells[index] = cell ^ FLAGGEDBIT
+        return [index]
+
+    # Digging at the cell index, flagged or not
+    # Returns the list of cells that were revealed, the game state tells if a bomb was hit, or if the game is won
+    # With max_cells, the flood fill stops after revealing about that many cells, and continue_explore() resumes it,
+    # so the front end can keep handling touches during a long cascade
+    def explore(self, index, max_cells=None):
+        cells = self.cells
+        cell = cells[index]
+        if self.state != RUNNING or (cell & REVEALEDBIT):
+            return []
+        if not self.generated:
+            self.generate(index)
+            cell = cells[index]
+
+        # Marking current location as already explored
+        if cell & FLAGGEDBIT:
+            self.flagged -= 1
+        cells[index] = (cell & ~FLAGGEDBIT) | REVEALEDBIT
+        changed = [index]
+
+        # If current location is a bomb, bad luck, lost the game
+        if cell & BOMBBIT:
+            self.state = LOST
+            self.exploded = index
+            self.dig_stack.clear()
+            return changed
+        self.explored += 1
+
+        # If location is 0, dig all unexplored neighbours until reaching location next to a bomb
+        if not (cell & COUNTMASK):
+            self.dig_stack.append(index)
+        self.dig(changed, max_cells)
+        return changed
+
+    # Chording on a revealed number: when as many of its neighbours are flagged as the number says,
+    # all its other unexplored neighbours are revealed in one go
+    # The zero cells found go on the same dig stack, so the whole chord is a single flood fill,
+    # and the returned list holds all the revealed cells, for a single refresh
+    # A wrong flag means one of the revealed neighbours is a bomb, and the game is lost, same as with explore()
+    def chord(self, index, max_cells=None):
+        cells = self.cells
+        cell = cells[index]
+        if self.state != RUNNING or not (cell & REVEALEDBIT) or not (cell & COUNTMASK):
+            return []
+        offsets = self.neighbour_offsets[self.neighbour_kind[index]]
+
+        flags = 0
+        for offset in offsets:
+            if cells[index + offset] & FLAGGEDBIT:
+                flags += 1
+        if flags != cell & COUNTMASK:
+            return []
+
+        changed = []
+        for offset in offsets:
+            i = index + offset
+            neighbour = cells[i]
+            if neighbour & (REVEALEDBIT | FLAGGEDBIT):
+                continue
+            cells[i] = neighbour | REVEALEDBIT
+            changed.append(i)
+            if neighbour & BOMBBIT:
+                self.state = LOST
+                self.exploded = i
+                self.dig_stack.clear()
+                return changed
+            self.explored += 1
+            if not (neighbour & COUNTMASK):
+                self.dig_stack.append(i)
+
+        # Also runs the win check, when the chord revealed the last safe cells
+        self.dig(changed, max_cells)
+        return changed
+
+    # Is a flood fill waiting to be continued
+    def is_digging(self):
+        return len(self.dig_stack) > 0
+
+    # Resuming the flood fill started by explore(), returns the list of cells revealed in this slice
+    def continue_explore(self, max_cells=None):
+        changed = []
+        if self.state == RUNNING:
+            self.dig(changed, max_cells)
+        return changed
+
+    # Flood fill, exploration continues on all other locations with values of 0 to 8,
+    # that can be reached from the locations with value 0 on the dig stack
+    # The stack holds flat cell indices, and the neighbours come from the neighbour table
+    # The revealed cells are added to the changed list, stopping once it has max_cells more cells, if given
+    def dig(self, changed, max_cells):
+        cells = self.cells
+        neighbour_kind = self.neighbour_kind
+        neighbour_offsets = self.neighbour_offsets
+        dig_stack = self.dig_stack
+        if max_cells is not None:
+            max_cells += len(changed)
+        while dig_stack:
+            if max_cells is not None and len(changed) >= max_cells:
+                # Time slice used up, the rest of the stack waits for continue_explore()
+                return
+            pop_index = dig_stack.pop()
+            for offset in neighbour_offsets[neighbour_kind[pop_index]]:
+                i = pop_index + offset
+                cell = cells[i]
+                if cell & (REVEALEDBIT | BOMBBIT):  # already explored location, or bomb, ignore
+                    continue
+
+                # If exploring reveals a tile falsely flagged, update the flagged tiles counter
+                if cell & FLAGGEDBIT:
+                    self.flagged -= 1
+
+                # Mark the location as explored, clearing a potential false flag
+                cells[i] = (cell & ~FLAGGEDBIT) | REVEALEDBIT
+                self.explored += 1
+                changed.append(i)
+
+                if cell & COUNTMASK:
+                    # Location neighbouring bombs, ignore after marking it as explored
+                    continue
+
+                # Location is 0, has no neighbouring bombs, continue exploration
+                dig_stack.append(i)
+
+        # WIN CONDITION: All non-bomb locations have been explored, the game is won
+        # Only checked once the whole cascade is finished
+        if self.explored == self.cells_count - self.number_of_bombs:
+            self.state = WON
+
+    # Showing the whole board when the game is lost, bombs, numbers, and the wrongly flagged cells
+    # Returns the range of all the cells, any of them can change here, and on a large board
+    # a list of changed cells would take a lot of RAM - the front end compares the tiles it shows anyway
+    def reveal_all(self):
+        cells = self.cells
+        for i in range(self.cells_count):
+            cell = cells[i]
+            if (cell & FLAGGEDBIT) and not (cell & BOMBBIT):
+                # Wrongly flagged cell, stays flagged and shows as NOTABOMB once the game is lost
+                continue
+            cells[i] = cell | REVEALEDBIT
+        return range(self.cells_count)
+
+    # Only for debugging purposes - printing the generated game board, with bomb locations
+    def print_board(self):
+        for y in range(self.vtiles):
+            bomb_string = ""
+            for x in range(self.htiles):
+                cell = self.cells[x + y*self.htiles]
+                if cell & BOMBBIT:
+                    bomb_string = bomb_string + "  " + "*"
+                else:
+                    bomb_string = bomb_string + "  " + str(cell & COUNTMASK)
+            print(bomb_string)
@@ -0,0 +1,105 @@
+# Move log for the Minesweeper engine, with no display code
+# A game is recorded as its seed and the list of moves, each packed in 2 bytes: the cell index and the action
+# Replaying the moves on an engine with the same board size and seed gives back the exact same game,
+# on the PyPortal or on a computer, for bug reports and benchmarks
+
+import struct
+from array import array
+
+
+# ==================== Move log constants ====================
+
+# Actions, in the top 2 bits of a move, the cell index is in the lower 14 bits
+EXPLORE = 0
+FLAG = 1
+CHORD = 2
+ACTIONSHIFT = 14
+INDEXMASK = 0x3FFF  # boards up to 16384 cells
+
+LOGMAGIC = b"MSLG"
+LOGVERSION = 2  # bumped whenever the record layout changes, older records are rejected
+
+# Header: magic, version, 1 if the log holds the whole game, tiles on the horizontal, tiles on the vertical,
+# number of bombs, seed, number of moves
+LOGHEADER = "<4sBBHHHIH"
+LOGHEADERSIZE = struct.calcsize(LOGHEADER)
+
+
+# ==================== Move log ====================
+
+class MoveLog:
+    def __init__(self, size=1024):
+        self.moves = array('H', bytes(2*size))  # ring buffer of packed moves
+        self.start = 0  # position of the oldest move
+        self.count = 0  # number of moves in the buffer
+        self.seed = 0  # seed of the recorded game
+        self.complete = True  # the buffer holds the whole game, it can be replayed
+
+    # Starting the log of a new game
+    def clear(self, seed):
+        self.start = 0
+        self.count = 0
+        self.seed = seed
+        self.complete = True
+
+    # Adding a move, once the buffer is full the oldest moves are overwritten,
+    # and the game can't be replayed anymore, but the latest moves are still there for a bug report
+    def record(self, index, action):
+        size = len(self.moves)
+        self.moves[(self.start + self.count) % size] = (action << ACTIONSHIFT) | index
+        if self.count < size:
+            self.count += 1
+        else:
+            self.start = (self.start + 1) % size
+            self.complete = False
+
+    # Packed moves, oldest first
+    def __iter__(self):
+        size = len(self.moves)
+        for n in range(self.count):
+            yield self.moves[(self.start + n) % size]
+
+    # Packing the log into a record, with the board size of the engine
+    def to_bytes(self, engine):
+        record = bytearray(LOGHEADERSIZE + 2*self.count)
+        struct.pack_into(LOGHEADER, record, 0, LOGMAGIC, LOGVERSION, 1 if self.complete else 0,
+                         engine.htiles, engine.vtiles, engine.number_of_bombs, self.seed, self.count)
+        offset = LOGHEADERSIZE
+        for move in self:
+            struct.pack_into("<H", record, offset, move)
+            offset += 2
+        return record
+
+# Unpacking a record made by MoveLog.to_bytes()
+# Returns (htiles, vtiles, number of bombs, seed, array of packed moves, complete), or None if it's not a move log,
+# or one from another version
+# An incomplete log only holds the last moves of a game, from an overflowed buffer or a resumed game,
+# replaying them from a new board doesn't give back the game that was played
+def read_log(record):
+    if len(record) < LOGHEADERSIZE:
+        return None
+    (magic, version, complete, htiles, vtiles, bombs, seed, count) = struct.unpack_from(LOGHEADER, record, 0)
+    if magic != LOGMAGIC or version != LOGVERSION or len(record) < LOGHEADERSIZE + 2*count:
+        return None
+    moves = array('H', bytes(2*count))
+    for n in range(count):
+        moves[n] = struct.unpack_from("<H", record, LOGHEADERSIZE + 2*n)[0]
+    return (htiles, vtiles, bombs, seed, moves, complete == 1)
+
+# Playing a recorded game again, on an engine with the board size of the recording
+# The flood fills are not sliced, each move is finished before the next one
+# Returns the engine, with the game as it was after the last move
+def replay(engine, seed, moves):
+    engine.new_game(seed)
+    for move in moves:
+        index = move & INDEXMASK
+        action = move >> ACTIONSHIFT
+        if action == FLAG:
+            engine.flag(index)
+        elif action == CHORD:
+            engine.chord(index)
+        else:
+            engine.explore(index)
+        while engine.is_digging():
+            engine.continue_explore()
+    return engine
@@ -0,0 +1,508 @@
+# Bomb probability estimates for the Minesweeper engine, with no display code
+# Samples bomb layouts that fit the revealed numbers, and counts how often each frontier cell holds a bomb
+# The frontier cells are the unexplored cells next to a revealed number, the ones the player has to choose from
+# Sampling runs in short time slices, the estimates get better as the sample count grows,
+# and they are kept until the next explored cell makes them stale
+
+import math
+from array import array
+from minesweeper_engine import COUNTMASK, REVEALEDBIT, RUNNING, next_random, ticks_ms
+
+
+LOG2 = math.log(2)
+UNSET = 2  # frontier cell not chosen yet, in the sample being built
+GROUPTRIES = 50  # attempts at a layout for one group of frontier cells, before giving up on the sample
+REBUILDCELLS = 64  # cells scanned, walked, reset or added to the sums between two time checks
+
+# Time check for the work done in slices, a None deadline never passes
+def out_of_time(deadline):
+    return deadline is not None and ticks_ms() >= deadline
+
+
+# ==================== Probability sampler ====================
+
+class ProbabilitySampler:
+    def __init__(self, engine, max_samples=1000):
+        self.engine = engine
+        self.max_samples = max_samples  # sampling stops once this many layouts were found
+        self.random_state = 0x2545F491
+        self.stale = True  # the frontier has to be found again before sampling
+        self.samples = 0  # number of layouts found, that fit the revealed numbers
+        self.tries = 0  # number of layouts tried, including the dead ends
+
+        # Frontier, rebuilt when stale
+        self.frontier = array('H')  # frontier cells, one group of linked cells after the other
+        self.position = {}  # position in the frontier list for each frontier cell
+        self.group_start = array('H')  # where each group starts in the frontier list, and its end
+        self.link_start = array('H')  # for each frontier cell, where its numbers start in links
+        self.links = array('H')  # positions of the revealed numbers next to each frontier cell
+        self.start_need = bytearray(0)  # bombs around each revealed number, not counting the samples
+        self.start_left = bytearray(0)  # unexplored neighbours of each revealed number
+        self.need = bytearray(0)  # working copies, for the sample being built
+        self.left = bytearray(0)
+        self.member_start = array('H')  # for each revealed number, where its frontier cells start in members
+        self.members = array('H')  # positions of the frontier cells next to each revealed number
+        self.chosen = bytearray(0)  # 1 for each frontier cell holding a bomb in the sample being built
+        self.log_layouts = []  # log of the number of ways to place the other bombs, for each number of frontier bombs
+
+        # Sums of the sample weights, scaled by exp(-reference) to stay in float range
+        self.bomb_weights = array('f')  # for each frontier cell, samples with a bomb there
+        self.total_weight = 0.0
+        self.reference = 0.0
+
+        # Frontier being found, in slices, on a big board it takes much longer than a time slice
+        # The arrays above are built as lists meanwhile
+        self.building = False
+        self.scan = 0  # next board cell to scan
+        self.number_position = {}  # position in numbers for each revealed number next to an unexplored cell
+        self.numbers = []  # revealed numbers next to an unexplored cell
+        self.number_cells = []  # for each of them, the unexplored cells next to it
+        self.cell_numbers = {}  # for each unexplored cell next to a number, the positions of its numbers
+        self.walk_order = None  # cells the group walks start from, in index order
+        self.walk_next = 0  # next walk start to try
+        self.walk_p = 0  # next frontier cell to walk from
+        self.pack = 0  # next revealed number to add to members
+        self.layout_k = None  # next number of frontier bombs for log_layouts, None before starting
+        self.layout_log = 0.0
+
+        # Sample being built, in slices, a group on a big board can be too long for a single time slice
+        self.group = -1  # group being sampled, -1 when no sample is in progress
+        self.group_tries = 0  # dead ends met on the group so far
+        self.reset_p = 0  # next frontier cell to reset in the group, before choosing any
+        self.cursor = 0  # next frontier cell to choose in the group
+        self.trail = []  # choices made in the group, for undoing them
+        self.log_choices = 0.0  # log of the number of random choices made in the group
+        self.log_weight = 0.0  # log weight of the sample, from the groups already done
+        self.group_bombs = 0  # bombs chosen in the group so far
+        self.sample_bombs = 0  # bombs chosen in the groups already done
+        self.add_p = -1  # next frontier cell to add the sample to, -1 when the sample isn't being added
+        self.add_scale = 1.0  # rescaling of the sums for the sample being added
+        self.add_weight = 0.0  # weight of the sample being added
+
+    # Following the engine, with the lists of changed cells its actions return
+    # Any explored cell makes the estimates stale, flag changes don't, the player's flags can be wrong
+    def update(self, changed):
+        cells = self.engine.cells
+        for i in changed:
+            if cells[i] & REVEALEDBIT:
+                self.stale = True
+                return
+
+    # Dropping the estimates, for a new game
+    def reset(self):
+        self.stale = True
+
+    # Is there more sampling to do
+    def sampling(self):
+        engine = self.engine
+        if not engine.generated or engine.state != RUNNING:
+            return False
+        return self.stale or self.building or (self.samples < self.max_samples and len(self.frontier) > 0
+                                               and self.tries < 2*self.max_samples)
+
+    # Finding the frontier and the revealed numbers around it, once for each revealed state of the board
+    # The frontier is split in groups of cells linked by shared numbers, each group is sampled on its own,
+    # and its cells are listed in the order of a walk along it, so the choices that depend on each other are close
+    # Works until the deadline, checked every REBUILDCELLS cells or numbers, and goes on from there on the next call
+    # A stale frontier starts over, returns True once the frontier is ready
+    def rebuild_step(self, deadline):
+        if self.stale:
+            self.stale = False
+            self.building = True
+            self.group = -1
+            self.add_p = -1
+            self.samples = 0
+            self.total_weight = 0.0
+            self.scan = 0
+            self.number_position = {}
+            self.numbers = []
+            self.number_cells = []
+            self.cell_numbers = {}
+            self.walk_order = None
+            self.position = {}
+            self.frontier = []
+            self.group_start = []
+            self.links = []
+            self.link_start = [0]
+            self.members = []
+            self.member_start = [0]
+            self.pack = 0
+            self.layout_k = None
+
+        # Revealed numbers next to each unexplored cell, and the unexplored cells next to each revealed number
+        engine = self.engine
+        cells_count = engine.cells_count
+        while self.scan < cells_count:
+            last = min(self.scan + REBUILDCELLS, cells_count)
+            self.scan_cells(self.scan, last)
+            self.scan = last
+            if self.scan < cells_count and out_of_time(deadline):
+                return False
+
+        # Walking each group of linked cells
+        if self.walk_order is None:
+            self.walk_order = sorted(self.cell_numbers)
+            self.walk_next = 0
+            self.walk_p = 0
+            self.start_need = bytearray(len(self.numbers))
+            self.start_left = bytearray(len(self.numbers))
+        walking = True
+        while walking:
+            for _ in range(REBUILDCELLS):
+                walking = self.walk_one()
+                if not walking:
+                    break
+            if walking and out_of_time(deadline):
+                return False
+
+        # Frontier cells next to each revealed number, the unexplored neighbours of a number are all on the frontier
+        cells = engine.cells
+        numbers = self.numbers
+        while self.pack < len(numbers):
+            last = min(self.pack + REBUILDCELLS, len(numbers))
+            for q in range(self.pack, last):
+                self.members.extend(self.position[i] for i in self.number_cells[q])
+                self.member_start.append(len(self.members))
+                self.start_need[q] = cells[numbers[q]] & COUNTMASK
+                self.start_left[q] = len(self.number_cells[q])
+            self.pack = last
+            if self.pack < len(numbers) and out_of_time(deadline):
+                return False
+
+        # The cells away from the frontier share the bombs not placed on it, all the ways of doing that count,
+        # log of binomial(others, bombs - k) for k frontier bombs, relative to the smallest possible k
+        others = cells_count - engine.explored - len(self.frontier)
+        bombs = engine.number_of_bombs
+        if self.layout_k is None:
+            self.log_layouts = [None] * (len(self.frontier) + 1)
+            self.layout_k = max(0, bombs - others)
+            self.layout_log = 0.0
+        end = min(bombs, len(self.frontier)) + 1
+        while self.layout_k < end:
+            last = min(self.layout_k + REBUILDCELLS, end)
+            for k in range(self.layout_k, last):
+                self.log_layouts[k] = self.layout_log
+                rest = bombs - k
+                if rest > 0:
+                    self.layout_log += math.log(rest / (others - rest + 1))
+            self.layout_k = last
+            if self.layout_k < end and out_of_time(deadline):
+                return False
+
+        self.finish_rebuild()
+        return True
+
+    def scan_cells(self, first, last):
+        engine = self.engine
+        cells = engine.cells
+        neighbour_kind = engine.neighbour_kind
+        neighbour_offsets = engine.neighbour_offsets
+        number_position = self.number_position
+        numbers = self.numbers
+        number_cells = self.number_cells
+        cell_numbers = self.cell_numbers
+        for i in range(first, last):
+            if cells[i] & REVEALEDBIT:
+                continue
+            linked = []
+            for offset in neighbour_offsets[neighbour_kind[i]]:
+                j = i + offset
+                if cells[j] & REVEALEDBIT and cells[j] & COUNTMASK:
+                    if j not in number_position:
+                        number_position[j] = len(numbers)
+                        numbers.append(j)
+                        number_cells.append([])
+                    q = number_position[j]
+                    linked.append(q)
+                    number_cells[q].append(i)
+            if linked:
+                cell_numbers[i] = linked
+
+    # Adding the numbers of one frontier cell to links, and the cells linked to it to the frontier,
+    # or starting the next group when the current one is walked
+    # Returns False when all the groups are walked
+    def walk_one(self):
+        frontier = self.frontier
+        position = self.position
+        if self.walk_p < len(frontier):
+            linked = self.cell_numbers[frontier[self.walk_p]]
+            self.links.extend(linked)
+            self.link_start.append(len(self.links))
+            for q in linked:
+                for j in self.number_cells[q]:
+                    if j not in position:
+                        position[j] = len(frontier)
+                        frontier.append(j)
+            self.walk_p += 1
+            return True
+        while self.walk_next < len(self.walk_order):
+            i = self.walk_order[self.walk_next]
+            self.walk_next += 1
+            if i not in position:
+                self.group_start.append(len(frontier))
+                position[i] = len(frontier)
+                frontier.append(i)
+                return True
+        return False
+
+    # Turning the lists into arrays, for the sampling
+    def finish_rebuild(self):
+        self.group_start.append(len(self.frontier))
+        self.frontier = array('H', self.frontier)
+        self.group_start = array('H', self.group_start)
+        self.links = array('H', self.links)
+        self.link_start = array('H', self.link_start)
+        self.members = array('H', self.members)
+        self.member_start = array('H', self.member_start)
+        self.need = bytearray(len(self.numbers))
+        self.left = bytearray(len(self.numbers))
+        self.chosen = bytearray(len(self.frontier))
+
+        # Dropping the working lists
+        self.number_position = {}
+        self.numbers = []
+        self.number_cells = []
+        self.cell_numbers = {}
+        self.walk_order = None
+
+        self.bomb_weights = array('f', bytearray(4*len(self.frontier)))
+        self.total_weight = 0.0
+        self.reference = 0.0
+        self.samples = 0
+        self.tries = 0
+        self.building = False
+
+    # Finding the whole frontier at once, for the tools running on a computer
+    def rebuild(self):
+        self.stale = True
+        self.rebuild_step(None)
+
+    # Choosing a frontier cell, and every cell this forces: when a number has all its bombs, or needs all its cells
+    # The choices are recorded on the trail, so they can be undone
+    # Returns False if a number can't be satisfied anymore, the choices made so far stay on the trail
+    def assign(self, p, bomb, trail):
+        need = self.need
+        left = self.left
+        links = self.links
+        link_start = self.link_start
+        members = self.members
+        member_start = self.member_start
+        chosen = self.chosen
+        pending = [p, bomb]
+        while pending:
+            bomb = pending.pop()
+            p = pending.pop()
+            if chosen[p] != UNSET:
+                if chosen[p] != bomb:
+                    return False
+                continue
+            for l in range(link_start[p], link_start[p+1]):
+                q = links[l]
+                if (bomb and need[q] == 0) or (not bomb and need[q] == left[q]):
+                    return False
+            chosen[p] = bomb
+            self.group_bombs += bomb
+            trail.append(p)
+            for l in range(link_start[p], link_start[p+1]):
+                q = links[l]
+                left[q] -= 1
+                need[q] -= bomb
+                if left[q] and (need[q] == 0 or need[q] == left[q]):
+                    forced = 1 if need[q] else 0
+                    for m in range(member_start[q], member_start[q+1]):
+                        if chosen[members[m]] == UNSET:
+                            pending.append(members[m])
+                            pending.append(forced)
+        return True
+
+    # Undoing the choices made since the trail had mark entries
+    def undo(self, trail, mark):
+        need = self.need
+        left = self.left
+        links = self.links
+        link_start = self.link_start
+        chosen = self.chosen
+        while len(trail) > mark:
+            p = trail.pop()
+            bomb = chosen[p]
+            chosen[p] = UNSET
+            self.group_bombs -= bomb
+            for l in range(link_start[p], link_start[p+1]):
+                q = links[l]
+                left[q] += 1
+                need[q] += bomb
+
+    # Starting a random layout of the bombs in the group being sampled
+    def start_group(self):
+        first = self.group_start[self.group]
+        self.reset_p = first
+        self.trail = []
+        self.group_bombs = 0
+        self.cursor = first
+        self.log_choices = 0.0
+
+    # Building the random layout of the group being sampled, that fits the revealed numbers
+    # The group cells and their numbers are reset first, then each cell still open is tried both ways,
+    # with the cells each choice forces, and chosen at random when both fit, so most dead ends are seen one step ahead
+    # The log of the number of random choices made is summed in log_choices, the layout is less likely the more
+    # there are
+    # Works until the deadline, checked every REBUILDCELLS cells reset and after each cell chosen,
+    # returns True once the layout is done, False for a dead end, when neither choice fits,
+    # and None when out of time, to go on from there on the next call
+    def continue_group(self, deadline):
+        last = self.group_start[self.group+1]
+        chosen = self.chosen
+        trail = self.trail
+        if self.reset_p < last:
+            need = self.need
+            left = self.left
+            links = self.links
+            link_start = self.link_start
+            start_need = self.start_need
+            start_left = self.start_left
+            while self.reset_p < last:
+                end = min(self.reset_p + REBUILDCELLS, last)
+                for p in range(self.reset_p, end):
+                    chosen[p] = UNSET
+                    for l in range(link_start[p], link_start[p+1]):
+                        q = links[l]
+                        need[q] = start_need[q]
+                        left[q] = start_left[q]
+                self.reset_p = end
+                if end < last and out_of_time(deadline):
+                    return None
+        while self.cursor < last:
+            p = self.cursor
+            self.cursor += 1
+            if chosen[p] != UNSET:
+                continue
+            mark = len(trail)
+            can_bomb = self.assign(p, 1, trail)
+            self.undo(trail, mark)
+            can_free = self.assign(p, 0, trail)
+            if can_free and can_bomb:
+                self.random_state = next_random(self.random_state)
+                self.log_choices += LOG2
+                if self.random_state & 1:
+                    self.undo(trail, mark)
+                    self.assign(p, 1, trail)
+            elif can_bomb:
+                self.undo(trail, mark)
+                self.assign(p, 1, trail)
+            elif not can_free:
+                return False
+            if self.cursor < last and out_of_time(deadline):
+                return None
+        return True
+
+    # Building one random layout of all the frontier bombs, group after group, and adding it to the sums
+    # The layouts are not equally likely, the weight of a sample corrects for that,
+    # and for the number of ways to place the other bombs
+    # A group that reaches a dead end is tried again, up to GROUPTRIES times, the groups are independent,
+    # so this doesn't change the relative weights of the samples
+    # Works until the deadline, and goes on with the same sample on the next call
+    # Returns True if the sample was added, False if no layout was found, and None when out of time
+    def sample_step(self, deadline):
+        last_group = len(self.group_start) - 1
+        if self.group < 0:
+            self.tries += 1
+            self.log_weight = 0.0
+            self.sample_bombs = 0
+            self.group = 0
+            self.group_tries = 0
+            self.start_group()
+        while self.group < last_group:
+            done = self.continue_group(deadline)
+            if done is None:
+                return None
+            if done:
+                self.log_weight += self.log_choices
+                self.sample_bombs += self.group_bombs
+                self.group += 1
+                self.group_tries = 0
+                if self.group < last_group:
+                    self.start_group()
+            else:
+                self.group_tries += 1
+                if self.group_tries == GROUPTRIES:
+                    self.group = -1
+                    return False
+                self.start_group()
+            if out_of_time(deadline):
+                return None
+
+        # Adding the layout to the sums, every REBUILDCELLS frontier cells
+        if self.add_p < 0 and not self.start_adding():
+            self.group = -1
+            return False
+        chosen = self.chosen
+        bomb_weights = self.bomb_weights
+        scale = self.add_scale
+        weight = self.add_weight
+        while self.add_p < len(chosen):
+            end = min(self.add_p + REBUILDCELLS, len(chosen))
+            for p in range(self.add_p, end):
+                if scale != 1.0:
+                    bomb_weights[p] *= scale
+                if chosen[p]:
+                    bomb_weights[p] += weight
+            self.add_p = end
+            if end < len(chosen) and out_of_time(deadline):
+                return None
+        self.add_p = -1
+        self.group = -1
+        self.samples += 1
+        return True
+
+    # Building a whole sample at once, for the tools running on a computer
+    def sample(self):
+        return self.sample_step(None)
+
+    # Weighing the layout in chosen, before adding it to the sums
+    # The total weight already counts it, the bomb weights of the cells from add_p on don't yet
+    # Returns False if it doesn't leave a possible number of bombs for the other cells
+    def start_adding(self):
+        bombs = self.sample_bombs
+        if self.log_layouts[bombs] is None:
+            # Not enough, or too many bombs left for the other cells
+            return False
+        log_weight = self.log_weight + self.log_layouts[bombs]
+
+        # Keeping the largest weight as the reference, so the sums never overflow
+        self.add_scale = 1.0
+        if self.samples == 0 or log_weight > self.reference:
+            self.add_scale = math.exp(self.reference - log_weight) if self.samples else 0.0
+            self.total_weight *= self.add_scale
+            self.reference = log_weight
+        self.add_weight = math.exp(log_weight - self.reference)
+        self.total_weight += self.add_weight
+        self.add_p = 0
+        return True
+
+    # Sampling for at most max_ms milliseconds, finding the frontier first if it's stale
+    # Both steps stop at the deadline and go on in the next slice, so a big board never blocks the touch handling
+    # Returns True if there is more sampling to do
+    def run(self, max_ms):
+        deadline = ticks_ms() + max_ms
+        while self.sampling() and ticks_ms() < deadline:
+            if self.stale or self.building:
+                self.rebuild_step(deadline)
+            else:
+                self.sample_step(deadline)
+        return self.sampling()
+
+    # Estimated bomb probability of a cell, from 0.0 to 1.0,
+    # or None if it's not on the frontier, there are no samples yet, or the game is over
+    def probability(self, index):
+        if self.stale or self.building or self.total_weight == 0.0 or self.engine.state != RUNNING:
+            return None
+        p = self.position.get(index)
+        if p is None:
+            return None
+        bomb_weight = self.bomb_weights[p]
+        if 0 <= self.add_p <= p:
+            # The sample being added hasn't reached this cell yet
+            bomb_weight *= self.add_scale
+            if self.chosen[p]:
+                bomb_weight += self.add_weight
+        return bomb_weight / self.total_weight
@@ -0,0 +1,131 @@
+# Replaying recorded Minesweeper games on a computer, as a benchmark for the engine
+# Runs with CPython, not on the PyPortal:
+#     python3 minesweeper_replay.py [log files...]
+# Each log file holds move logs in hex, one per line, as printed by the game in debug mode when a game is over,
+# other lines are ignored, so the serial console output can be used as it is
+# With no log file, games are recorded first, by letting the hint solver play random boards of each difficulty
+
+import sys
+import time
+import binascii
+from minesweeper_engine import MinesweeperEngine, RUNNING, WON, REVEALEDBIT, DIFFICULTIES, np
+from minesweeper_solver import MinesweeperSolver
+from minesweeper_log import MoveLog, EXPLORE, FLAG, INDEXMASK, read_log, replay
+
+RECORDEDGAMES = 200  # games recorded for each difficulty, when no log file is given
+REPEATS = 5  # times each game is replayed, the best time is kept
+
+
+# Move logs from hex lines
+# The incomplete ones, with the last moves of a game only, can't be replayed, they are counted and skipped
+def load_logs(paths):
+    logs = []
+    incomplete = 0
+    for path in paths:
+        with open(path) as log_file:
+            for line in log_file:
+                line = line.strip()
+                try:
+                    record = binascii.unhexlify(line)
+                except (binascii.Error, ValueError):
+                    continue
+                log = read_log(record)
+                if log is None:
+                    continue
+                if log[5]:
+                    logs.append(log)
+                else:
+                    incomplete += 1
+    if incomplete:
+        print("{} incomplete logs skipped, they only hold the last moves of a game".format(incomplete))
+    return logs
+
+# Move logs of games played by the hint solver, guessing at random when it has no sure move
+def record_logs(games):
+    logs = []
+    for (_, htiles, vtiles, bombs) in DIFFICULTIES:
+        engine = MinesweeperEngine(htiles, vtiles, bombs)
+        solver = MinesweeperSolver(engine)
+        move_log = MoveLog(htiles*vtiles*2)
+        guess_state = 12345
+        for game in range(games):
+            seed = game + 1
+            engine.new_game(seed)
+            solver.reset()
+            move_log.clear(seed)
+            index = (htiles*vtiles) // 2
+            move_log.record(index, EXPLORE)
+            solver.update(engine.explore(index))
+            while engine.state == RUNNING:
+                hint = solver.hint()
+                if hint is None:
+                    # Guessing a pseudo random cell among the unexplored ones the solver knows nothing about
+                    guess_state = (guess_state * 1103515245 + 12345) & 0x7FFFFFFF
+                    unknown = [index for index in range(engine.cells_count)
+                               if not (engine.cells[index] & REVEALEDBIT) and not solver.known[index]]
+                    index = unknown[guess_state % len(unknown)]
+                    move_log.record(index, EXPLORE)
+                    solver.update(engine.explore(index))
+                elif hint[1]:
+                    move_log.record(hint[0], FLAG)
+                    solver.update(engine.flag(hint[0]))
+                else:
+                    move_log.record(hint[0], EXPLORE)
+                    solver.update(engine.explore(hint[0]))
+            logs.append(read_log(move_log.to_bytes(engine)))
+    return logs
+
+def main(paths):
+    logs = load_logs(paths) if paths else record_logs(RECORDEDGAMES)
+    print("{} games".format(len(logs)))
+
+    # Grouping the games by board, one engine for each
+    boards = {}
+    for log in logs:
+        boards.setdefault(log[:3], []).append(log)
+
+    for ((htiles, vtiles, bombs), board_logs) in sorted(boards.items()):
+        engine = MinesweeperEngine(htiles, vtiles, bombs)
+        moves = sum(len(log[4]) for log in board_logs)
+        wins = 0
+        final_boards = []
+        for log in board_logs:
+            replay(engine, log[3], log[4])
+            wins += engine.state == WON
+            final_boards.append(bytes(engine.cells[:engine.cells_count]))
+
+        # Whole games, the same game must always end the same way
+        best_replay = None
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            for n, log in enumerate(board_logs):
+                replay(engine, log[3], log[4])
+                if bytes(engine.cells[:engine.cells_count]) != final_boards[n]:
+                    print("replay mismatch, seed", log[3])
+            elapsed = time.perf_counter() - start
+            best_replay = elapsed if best_replay is None else min(best_replay, elapsed)
+
+        # Board generation only, the first move of each game, with the vectorized neighbour counts too when available
+        generation = []
+        default = engine.vectorized
+        for vectorized in ((False, True) if np is not None else (False,)):
+            engine.vectorized = vectorized
+            best_generate = None
+            for _ in range(REPEATS):
+                start = time.perf_counter()
+                for log in board_logs:
+                    engine.new_game(log[3])
+                    if len(log[4]):
+                        engine.generate(log[4][0] & INDEXMASK)
+                elapsed = time.perf_counter() - start
+                best_generate = elapsed if best_generate is None else min(best_generate, elapsed)
+            generation.append("{} {:.3f} ms/game".format("vectorized" if vectorized else "generation",
+                                                         1000*best_generate/len(board_logs)))
+        engine.vectorized = default
+
+        print("{}x{}, {} bombs: {} games, {} wins, {} moves".format(htiles, vtiles, bombs, len(board_logs), wins, moves))
+        print("    replay {:.3f} ms/game, {:.0f} moves/s, {}".format(
+            1000*best_replay/len(board_logs), moves/best_replay, ", ".join(generation)))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
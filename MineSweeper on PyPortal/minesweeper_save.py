@@ -0,0 +1,73 @@
+# Saving and resuming a Minesweeper game, as a compact binary record, with no display or storage code
+# The record is a fixed size header followed by the engine cells, one byte each, copied as they are,
+# so saving and resuming are a single buffer copy, and a 20x12 board takes 264 bytes
+# The front end decides where the record is kept, microcontroller.nvm or a file
+
+import struct
+from minesweeper_engine import RUNNING
+
+
+# ==================== Save record constants ====================
+
+SAVEMAGIC = b"MSWP"
+SAVEVERSION = 1  # bumped whenever the record layout or the cell layout changes, older records are rejected
+
+# Header: magic, version, difficulty, tiles on the horizontal, tiles on the vertical, number of bombs,
+# seed, seconds played, number of flags, number of explored cells
+SAVEHEADER = "<4sBBHHHIIHH"
+SAVEHEADERSIZE = struct.calcsize(SAVEHEADER)
+
+
+# ==================== Save and resume ====================
+
+# Size of the record for a board
+def save_size(cells_count):
+    return SAVEHEADERSIZE + cells_count
+
+# Packing a running game into a new record
+# A pending flood fill is finished first, the record has no room for the dig stack
+# Only games in progress are worth saving, None is returned for a game not started yet, or already over
+def save_game(engine, difficulty, seconds):
+    while engine.is_digging():
+        engine.continue_explore()
+    if not engine.generated or engine.state != RUNNING:
+        return None
+    record = bytearray(save_size(engine.cells_count))
+    struct.pack_into(SAVEHEADER, record, 0, SAVEMAGIC, SAVEVERSION, difficulty,
+                     engine.htiles, engine.vtiles, engine.number_of_bombs,
+                     engine.seed, seconds, engine.flagged, engine.explored)
+    record[SAVEHEADERSIZE:] = memoryview(engine.cells)[:engine.cells_count]
+    return record
+
+# Reading the header of a record, only the first SAVEHEADERSIZE bytes are needed
+# Returns (difficulty, htiles, vtiles, number of bombs, seed, seconds, flags, explored cells),
+# or None if it's not a save record, or one from another version
+def read_save(header):
+    if len(header) < SAVEHEADERSIZE:
+        return None
+    (magic, version, difficulty, htiles, vtiles, bombs,
+     seed, seconds, flagged, explored) = struct.unpack_from(SAVEHEADER, header, 0)
+    if magic != SAVEMAGIC or version != SAVEVERSION:
+        return None
+    return (difficulty, htiles, vtiles, bombs, seed, seconds, flagged, explored)
+
+# Putting a saved game back in the engine, which must already have the board size of the record
+# Returns False if the record doesn't match the engine, and leaves the engine untouched
+def load_save(engine, record):
+    saved = read_save(record)
+    if saved is None:
+        return False
+    (_, htiles, vtiles, bombs, seed, _, flagged, explored) = saved
+    if (htiles, vtiles, bombs) != (engine.htiles, engine.vtiles, engine.number_of_bombs) or \
+        len(record) < save_size(engine.cells_count):
+        return False
+
+    engine.cells[:engine.cells_count] = memoryview(record)[SAVEHEADERSIZE:save_size(engine.cells_count)]
+    engine.seed = seed
+    engine.generated = True
+    engine.state = RUNNING
+    engine.flagged = flagged
+    engine.explored = explored
+    engine.exploded = -1
+    engine.dig_stack.clear()
+    return True
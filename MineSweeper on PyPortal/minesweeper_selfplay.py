@@ -0,0 +1,148 @@
+# Self-play statistics for the Minesweeper engine, on a computer, using all the cores
+# Runs with CPython, not on the PyPortal:
+#     python3 minesweeper_selfplay.py [--games N] [--policy solver|probability] [--custom 20x12x30 ...] [--workers N]
+# The hint solver plays random boards of each difficulty, making every sure move it finds,
+# and guessing when it has none, at random with the "solver" policy,
+# or on the cell with the lowest estimated bomb probability with the "probability" policy
+# For each board it prints the win rate, the guesses needed, and the engine and games throughput
+
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from minesweeper_engine import MinesweeperEngine, RUNNING, WON, REVEALEDBIT, DIFFICULTIES, next_random
+from minesweeper_solver import MinesweeperSolver, KNOWNBOMB
+from minesweeper_probability import ProbabilitySampler
+
+GAMES = 10000  # games for each board, when not given
+CHUNKGAMES = 500  # games played by a worker in one go
+SAMPLES = 200  # bomb layouts sampled before each guess, with the probability policy
+MAXGUESSES = 10  # games needing more guesses are counted together
+
+
+# Cell picked at random among the unexplored cells the solver knows nothing about
+def random_guess(engine, solver, state):
+    eligible = [index for index in range(engine.cells_count)
+                if not (engine.cells[index] & REVEALEDBIT) and not solver.known[index]]
+    if not eligible:
+        return state % engine.cells_count
+    return eligible[state % len(eligible)]
+
+# Cell with the lowest estimated bomb probability, from the frontier or from the cells away from it
+# The bombs not expected on the frontier are spread evenly over the other unexplored cells
+def probability_guess(engine, solver, sampler, state):
+    sampler.rebuild()
+    while sampler.sampling():
+        sampler.sample()
+    best = None
+    best_probability = 2.0
+    frontier_bombs = 0.0
+    others = []
+    for index in range(engine.cells_count):
+        if engine.cells[index] & REVEALEDBIT or solver.known[index]:
+            continue
+        probability = sampler.probability(index)
+        if probability is None:
+            others.append(index)
+        else:
+            frontier_bombs += probability
+            if probability < best_probability:
+                best = index
+                best_probability = probability
+    if others:
+        known_bombs = sum(1 for index in range(engine.cells_count) if solver.known[index] == KNOWNBOMB)
+        if (engine.number_of_bombs - known_bombs - frontier_bombs) / len(others) < best_probability:
+            return others[state % len(others)]
+    return best if best is not None else random_guess(engine, solver, state)
+
+# Playing a range of seeds on one board, in a worker process
+# Returns (games, wins, guesses, games for each guess count, engine moves, seconds in the engine, seconds in all)
+def play_games(htiles, vtiles, bombs, policy, first_seed, games):
+    start_all = time.perf_counter()
+    engine = MinesweeperEngine(htiles, vtiles, bombs)
+    solver = MinesweeperSolver(engine)
+    sampler = ProbabilitySampler(engine, max_samples=SAMPLES) if policy == "probability" else None
+    wins = 0
+    guesses = 0
+    guess_counts = [0] * (MAXGUESSES + 1)
+    moves = 0
+    engine_seconds = 0.0
+    for seed in range(first_seed, first_seed + games):
+        engine.new_game(seed)
+        solver.reset()
+        state = seed
+        game_guesses = 0
+        index = engine.cells_count // 2  # the first move is always safe, it isn't counted as a guess
+        is_bomb = False
+        while True:
+            start = time.perf_counter()
+            changed = engine.flag(index) if is_bomb else engine.explore(index)
+            engine_seconds += time.perf_counter() - start
+            moves += 1
+            if engine.state != RUNNING:
+                break
+            solver.update(changed)
+            hint = solver.hint()
+            if hint is not None:
+                (index, is_bomb) = hint
+                continue
+            state = next_random(state)
+            if sampler is not None:
+                index = probability_guess(engine, solver, sampler, state)
+            else:
+                index = random_guess(engine, solver, state)
+            is_bomb = False
+            game_guesses += 1
+        wins += engine.state == WON
+        guesses += game_guesses
+        guess_counts[min(game_guesses, MAXGUESSES)] += 1
+    return (games, wins, guesses, guess_counts, moves, engine_seconds, time.perf_counter() - start_all)
+
+def main():
+    parser = argparse.ArgumentParser(description="Self-play statistics for the Minesweeper engine")
+    parser.add_argument("--games", type=int, default=GAMES, help="games for each board")
+    parser.add_argument("--policy", choices=("solver", "probability"), default="solver",
+                        help="how to guess when there is no sure move")
+    parser.add_argument("--custom", action="append", default=[],
+                        help="extra board, as HTILESxVTILESxBOMBS, can be given more than once")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    options = parser.parse_args()
+
+    boards = [(name, htiles, vtiles, bombs) for (name, htiles, vtiles, bombs) in DIFFICULTIES]
+    for custom in options.custom:
+        (htiles, vtiles, bombs) = (int(value) for value in custom.lower().split("x"))
+        boards.append((custom, htiles, vtiles, bombs))
+    print("{} games per board, {} policy, {} workers".format(options.games, options.policy, options.workers))
+
+    # All the chunks of all the boards are queued first, so the workers never wait for the slowest chunk of a board
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=options.workers) as executor:
+        board_chunks = [[executor.submit(play_games, htiles, vtiles, bombs, options.policy, first_seed,
+                                         min(CHUNKGAMES, options.games + 1 - first_seed))
+                         for first_seed in range(1, options.games + 1, CHUNKGAMES)]
+                        for (name, htiles, vtiles, bombs) in boards]
+        for ((name, htiles, vtiles, bombs), chunks) in zip(boards, board_chunks):
+            results = [chunk.result() for chunk in chunks]
+
+            games = sum(result[0] for result in results)
+            wins = sum(result[1] for result in results)
+            guesses = sum(result[2] for result in results)
+            guess_counts = [sum(result[3][n] for result in results) for n in range(MAXGUESSES + 1)]
+            moves = sum(result[4] for result in results)
+            engine_seconds = sum(result[5] for result in results)
+            cpu_seconds = sum(result[6] for result in results)
+
+            print("{} {}x{}, {} bombs ({:.1f}% density)".format(name, htiles, vtiles, bombs,
+                                                                 100*bombs/(htiles*vtiles)))
+            print("    win rate {:.2f}%, {:.2f} guesses/game, {:.1f}% of the games need no guess".format(
+                100*wins/games, guesses/games, 100*guess_counts[0]/games))
+            print("    guesses: " + ", ".join("{}{}: {:.1f}%".format(n, "+" if n == MAXGUESSES else "",
+                                                                     100*count/games)
+                                            for n, count in enumerate(guess_counts) if count))
+            print("    engine {:.0f} moves/s, {:.0f} games/s per core".format(moves/engine_seconds, games/cpu_seconds))
+    elapsed = time.perf_counter() - start
+    print("{} games in {:.1f} s, {:.0f} games/s on all cores".format(len(boards)*options.games, elapsed,
+                                                                     len(boards)*options.games/elapsed))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+# Minesweeper hint solver, with no display code
+# Finds cells that are certainly safe, or certainly bombs, using only what the player can see: the revealed numbers
+# Works directly on the engine cells, with a single extra byte per cell, and keeps a frontier of the revealed numbers
+# that still have unexplored neighbours, so a hint only looks again at the numbers around the cells that changed
+
+from minesweeper_engine import COUNTMASK, REVEALEDBIT, FLAGGEDBIT, RUNNING, WON, next_random, ticks_ms
+
+
+# ==================== Solver constants ====================
+
+# What the solver knows about a cell, one byte per cell
+KNOWNBOMB = 0x01  # the cell is certainly a bomb
+KNOWNSAFE = 0x02  # the cell is certainly safe, and can be explored
+
+
+# ==================== Hint solver ====================
+
+class MinesweeperSolver:
+    def __init__(self, engine):
+        self.engine = engine
+        self.known = bytearray(0)  # KNOWNBOMB/KNOWNSAFE for each cell, grows with the board like the engine buffers
+        self.frontier = set()  # revealed numbers with unexplored neighbours, as flat cell indices
+        self.dirty = set()  # frontier numbers whose neighbourhood changed since they were last checked
+        self.deductions = []  # cells found by the rules, and not explored yet
+        self.reset()
+
+    # Forgetting everything, for a new game or a new board size
+    def reset(self):
+        cells_count = self.engine.cells_count
+        if cells_count > len(self.known):
+            self.known = bytearray(cells_count)
+        else:
+            known = self.known
+            for i in range(cells_count):
+                known[i] = 0
+        self.frontier.clear()
+        self.dirty.clear()
+        self.deductions.clear()
+
+    def neighbours(self, index):
+        return self.engine.neighbour_offsets[self.engine.neighbour_kind[index]]
+
+    # Following the engine, with the lists of changed cells its actions return
+    # A revealed number joins the frontier, and the frontier numbers next to a revealed cell have to be checked again
+    # Flag changes are ignored, the player's flags can be wrong
+    def update(self, changed):
+        cells = self.engine.cells
+        frontier = self.frontier
+        dirty = self.dirty
+        for i in changed:
+            cell = cells[i]
+            if not (cell & REVEALEDBIT):
+                continue
+            if cell & COUNTMASK:
+                frontier.add(i)
+                dirty.add(i)
+            for offset in self.neighbours(i):
+                j = i + offset
+                if j in frontier:
+                    dirty.add(j)
+
+    # Unexplored neighbours of a revealed number that are not known yet, and how many bombs are among them
+    def constraint(self, index):
+        cells = self.engine.cells
+        known = self.known
+        unknown = []
+        bombs = cells[index] & COUNTMASK
+        for offset in self.neighbours(index):
+            j = index + offset
+            if cells[j] & REVEALEDBIT:
+                continue
+            if known[j]:
+                if known[j] & KNOWNBOMB:
+                    bombs -= 1
+                continue
+            unknown.append(j)
+        return unknown, bombs
+
+    # Recording certain cells, the numbers around them have one unknown cell less and are checked again
+    def found(self, indices, bomb):
+        known = self.known
+        mark = KNOWNBOMB if bomb else KNOWNSAFE
+        for j in indices:
+            if known[j]:
+                continue
+            known[j] = mark
+            self.deductions.append(j)
+            for offset in self.neighbours(j):
+                k = j + offset
+                if k in self.frontier:
+                    self.dirty.add(k)
+
+    # Frontier numbers sharing unknown cells with a number, at most two tiles away from it
+    def overlapping(self, index, unknown):
+        frontier = self.frontier
+        nearby = set()
+        for j in unknown:
+            for offset in self.neighbours(j):
+                k = j + offset
+                if k != index and k in frontier:
+                    nearby.add(k)
+        return nearby
+
+    # Applying the rules to the dirty numbers, until nothing new can be found
+    def solve(self):
+        frontier = self.frontier
+        dirty = self.dirty
+        while dirty:
+            a = dirty.pop()
+            (unknown_a, bombs_a) = self.constraint(a)
+            if not unknown_a:
+                # All neighbours explored or known, nothing left to find here
+                frontier.discard(a)
+                continue
+
+            # Single cell rules: no bombs left around the number, or as many bombs as unknown cells
+            if bombs_a == 0:
+                self.found(unknown_a, False)
+                continue
+            if bombs_a == len(unknown_a):
+                self.found(unknown_a, True)
+                continue
+
+            # Pairwise rule, comparing with each number sharing unknown cells with this one
+            # If the difference in bombs equals the cells only next to a, those are all bombs,
+            # and the cells only next to b are all safe
+            # With no cells only next to a, this is the subset rule: the cells only next to b hold the difference
+            for b in self.overlapping(a, unknown_a):
+                (unknown_b, bombs_b) = self.constraint(b)
+                only_a = [j for j in unknown_a if j not in unknown_b]
+                only_b = [j for j in unknown_b if j not in unknown_a]
+                if bombs_a - bombs_b == len(only_a):
+                    self.found(only_a, True)
+                    self.found(only_b, False)
+                elif bombs_b - bombs_a == len(only_b):
+                    self.found(only_b, True)
+                    self.found(only_a, False)
+                else:
+                    continue
+                if a in dirty:
+                    # The cells next to a changed, its list of unknown cells is out of date
+                    break
+
+    # Next certain move, as (cell index, True for a bomb), or None when the revealed numbers are not enough
+    # and the player has to guess
+    # Safe cells come first, bombs the player already flagged are skipped
+    def hint(self):
+        if not self.engine.generated:
+            return None
+        self.solve()
+
+        cells = self.engine.cells
+        self.deductions = [j for j in self.deductions if not (cells[j] & REVEALEDBIT)]
+        bomb = None
+        for j in self.deductions:
+            if self.known[j] & KNOWNSAFE:
+                return (j, False)
+            if bomb is None and not (cells[j] & FLAGGEDBIT):
+                bomb = j
+        if bomb is None:
+            return None
+        return (bomb, True)
+
+
+# ==================== No guess board generator ====================
+
+# Generating a board that can be solved from the first explored cell without any guess
+# Boards from successive seeds are played by the solver until one is won, or the time budget is used up,
+# in which case the last board is kept anyway, so a new game never hangs
+# The engine is left ready for the explore action at safe_index, with the flags placed before it still on the board,
+# and engine.seed recreates the board with the same first explore
+# Returns (number of boards tried, milliseconds taken, True if the board is proven solvable)
+def generate_no_guess(engine, solver, safe_index, budget_ms):
+    start = ticks_ms()
+    cells = engine.cells
+    flags = [i for i in range(engine.cells_count) if cells[i] & FLAGGEDBIT]
+    seed = engine.seed
+    attempts = 0
+    solved = False
+    while not solved:
+        attempts += 1
+        engine.new_game(seed)
+        engine.generate(safe_index)
+
+        # Playing only the certain moves, until the game is won or a guess would be needed
+        solver.reset()
+        solver.update(engine.explore(safe_index))
+        while engine.state == RUNNING and ticks_ms() - start < budget_ms:
+            hint = solver.hint()
+            if hint is None:
+                break
+            (index, bomb) = hint
+            if bomb:
+                solver.update(engine.flag(index))
+            else:
+                solver.update(engine.explore(index))
+        solved = engine.state == WON
+        if ticks_ms() - start >= budget_ms:
+            break
+        # xorshift gets stuck on a zero state, and the mask can bring any state down to zero
+        seed = next_random(seed or 0x9E3779B9) & 0x3FFFFFFF
+
+    # Hiding the solver's game, the board stays generated with only the player's flags on it
+    for i in range(engine.cells_count):
+        cells[i] &= ~(REVEALEDBIT | FLAGGEDBIT)
+    for i in flags:
+        cells[i] |= FLAGGEDBIT
+    engine.flagged = len(flags)
+    engine.explored = 0
+    engine.exploded = -1
+    engine.state = RUNNING
+    solver.reset()
+    return attempts, ticks_ms() - start, solved
@@ -0,0 +1,53 @@
+# Small fixed size queue for passing items between asyncio tasks
+# CircuitPython's asyncio has no Queue, this one is a ring buffer with two events, and never grows after creation
+
+import asyncio
+
+class SmallQueue:
+    def __init__(self, size):
+        self.items = [None] * size
+        self.start = 0  # position of the oldest item
+        self.count = 0  # number of items in the queue
+        self.not_empty = asyncio.Event()
+        self.not_full = asyncio.Event()
+        self.not_full.set()
+
+    def empty(self):
+        return self.count == 0
+
+    def full(self):
+        return self.count == len(self.items)
+
+    # Adding an item without waiting, returns False if the queue is full and the item was dropped
+    def put_nowait(self, item):
+        if self.full():
+            return False
+        self.items[(self.start + self.count) % len(self.items)] = item
+        self.count += 1
+        self.not_empty.set()
+        if self.full():
+            self.not_full.clear()
+        return True
+
+    # Removing the oldest item without waiting, the queue must not be empty
+    def get_nowait(self):
+        item = self.items[self.start]
+        self.items[self.start] = None  # don't keep a reference to the item
+        self.start = (self.start + 1) % len(self.items)
+        self.count -= 1
+        self.not_full.set()
+        if self.empty():
+            self.not_empty.clear()
+        return item
+
+    # Adding an item, waiting for a free slot if the queue is full
+    async def put(self, item):
+        while self.full():
+            await self.not_full.wait()
+        self.put_nowait(item)
+
+    # Removing the oldest item, waiting for one if the queue is empty
+    async def get(self):
+        while self.empty():
+            await self.not_empty.wait()
+        return self.get_nowait()
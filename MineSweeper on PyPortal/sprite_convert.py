@@ -0,0 +1,47 @@
+# Converting a palette indexed BMP image to the raw sprite sheet format of sprite_sheet.py
+# Runs with CPython, not on the PyPortal:
+#     python3 sprite_convert.py MineSweeperSpriteSheet.bmp MineSweeperSpriteSheet.spr
+# Only uncompressed BMP files with 1, 4 or 8 bits per pixel are read, the bit depth and the palette are kept
+
+import sys
+import struct
+from sprite_sheet import pack_sprite_sheet
+
+
+# Reading a palette indexed BMP file
+# Returns (width, height, bits per pixel, colors as 0xRRGGBB, palette indices row by row, top row first)
+def read_bmp(path):
+    with open(path, "rb") as bmp_file:
+        data = bmp_file.read()
+    if data[:2] != b"BM":
+        raise ValueError("not a BMP file: " + path)
+    data_start = struct.unpack_from("<I", data, 10)[0]
+    header_size = struct.unpack_from("<I", data, 14)[0]
+    (width, height, _, bits) = struct.unpack_from("<iiHH", data, 18)
+    (compression, _, _, _, color_count) = struct.unpack_from("<IIiiI", data, 30)
+    if bits not in (1, 4, 8) or compression != 0:
+        raise ValueError("only uncompressed 1, 4 or 8 bit BMP files can be converted")
+    color_count = color_count or 1 << bits
+
+    colors = []
+    for n in range(color_count):
+        (blue, green, red) = data[14 + header_size + 4*n:14 + header_size + 4*n + 3]
+        colors.append((red << 16) | (green << 8) | blue)
+
+    rows = abs(height)
+    bmp_row_size = ((width*bits + 31) // 32) * 4  # BMP rows are padded to 4 bytes
+    mask = (1 << bits) - 1
+    pixels = []
+    for y in range(rows):
+        row = data_start + ((rows - 1 - y) if height > 0 else y)*bmp_row_size  # bottom up unless the height is negative
+        for x in range(width):
+            bit = x*bits
+            pixels.append((data[row + bit // 8] >> (8 - bits - bit % 8)) & mask)
+    return (width, rows, bits, colors, pixels)
+
+if __name__ == "__main__":
+    (width, height, bits, colors, pixels) = read_bmp(sys.argv[1])
+    sheet = pack_sprite_sheet(width, height, bits, colors, pixels)
+    with open(sys.argv[2], "wb") as sprite_file:
+        sprite_file.write(sheet)
+    print("{}x{}, {} bits per pixel, {} colors: {} bytes".format(width, height, bits, len(colors), len(sheet)))
@@ -0,0 +1,83 @@
+# Raw sprite sheet format, palette indexed, loaded into a displayio Bitmap with a single bulk read
+# The file is a small header, the palette as 3 bytes per color, then the pixel rows, top row first,
+# each row packed with the first pixel in the high bits of its byte, and padded to a whole byte
+# That's the layout bitmaptools.readinto() reads, so no pixel goes through Python code on the PyPortal
+# sprite_convert.py makes these files from palette indexed BMP images, on a computer
+
+import struct
+
+# bitmaptools is in the PyPortal firmware, without it the rows are unpacked one pixel at a time
+try:
+    import bitmaptools
+except ImportError:
+    bitmaptools = None
+
+
+# ==================== Sprite sheet constants ====================
+
+SPRITEMAGIC = b"SPRT"
+SPRITEVERSION = 1  # bumped whenever the layout changes, older files are rejected
+
+# Header: magic, version, width, height, bits per pixel, number of palette colors
+SPRITEHEADER = "<4sBHHBH"
+SPRITEHEADERSIZE = struct.calcsize(SPRITEHEADER)
+
+
+# ==================== Sprite sheet files ====================
+
+# Bytes in one packed pixel row
+def row_size(width, bits):
+    return (width*bits + 7) // 8
+
+# Packing an image into the file layout, pixels are palette indices row by row, colors are 0xRRGGBB
+def pack_sprite_sheet(width, height, bits, colors, pixels):
+    data = bytearray(SPRITEHEADERSIZE + 3*len(colors) + height*row_size(width, bits))
+    struct.pack_into(SPRITEHEADER, data, 0, SPRITEMAGIC, SPRITEVERSION, width, height, bits, len(colors))
+    offset = SPRITEHEADERSIZE
+    for color in colors:
+        data[offset:offset+3] = bytes(((color >> 16) & 0xFF, (color >> 8) & 0xFF, color & 0xFF))
+        offset += 3
+    for y in range(height):
+        for x in range(width):
+            bit = x*bits
+            data[offset + bit // 8] |= pixels[x + y*width] << (8 - bits - bit % 8)
+        offset += row_size(width, bits)
+    return data
+
+# Reading the header
+# Returns (width, height, bits per pixel, number of colors), or None if it's not a sprite sheet,
+# or one from another version
+def read_sprite_header(header):
+    if len(header) < SPRITEHEADERSIZE:
+        return None
+    (magic, version, width, height, bits, colors) = struct.unpack_from(SPRITEHEADER, header, 0)
+    if magic != SPRITEMAGIC or version != SPRITEVERSION or bits not in (1, 2, 4, 8):
+        return None
+    return (width, height, bits, colors)
+
+# Loading a sprite sheet file, with the Bitmap and Palette classes to create, like adafruit_imageload.load()
+# Returns (bitmap, palette), raises ValueError if it's not a sprite sheet, and OSError if the file is missing
+def load_sprite_sheet(path, *, bitmap, palette):
+    with open(path, "rb") as sprite_file:
+        sheet = read_sprite_header(sprite_file.read(SPRITEHEADERSIZE))
+        if sheet is None:
+            raise ValueError("not a sprite sheet: " + path)
+        (width, height, bits, colors) = sheet
+
+        sheet_palette = palette(colors)
+        rgb = sprite_file.read(3*colors)
+        for n in range(colors):
+            sheet_palette[n] = (rgb[3*n] << 16) | (rgb[3*n+1] << 8) | rgb[3*n+2]
+
+        sheet_bitmap = bitmap(width, height, colors)
+        if bitmaptools is not None:
+            bitmaptools.readinto(sheet_bitmap, sprite_file, bits, element_size=1)
+        else:
+            mask = (1 << bits) - 1
+            rows = sprite_file.read(height*row_size(width, bits))
+            for y in range(height):
+                offset = y*row_size(width, bits)
+                for x in range(width):
+                    bit = x*bits
+                    sheet_bitmap[x, y] = (rows[offset + bit // 8] >> (8 - bits - bit % 8)) & mask
+    return sheet_bitmap, sheet_palette
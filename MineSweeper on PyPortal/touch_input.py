@@ -0,0 +1,105 @@
+# Touch screen input for the PyPortal games
+# Turns the raw touch_point readings into tap, long press and drag events,
+# with a press/release state machine and time based debounce, instead of a fixed sleep after every reading
+
+from minesweeper_engine import ticks_ms
+
+# Events returned by TouchInput.poll(), as (event, x, y) tuples
+# For DRAG the x and y are the distance moved since the previous DRAG event, not a position
+TAP = 1
+LONGPRESS = 2
+DRAG = 3
+
+# States of the press/release state machine
+IDLE = 0  # nothing touching the screen
+PRESSING = 1  # touch detected, waiting for it to be stable for the debounce time
+PRESSED = 2  # stable touch, becomes a tap on release, or a long press if held long enough
+HELD = 3  # long press already sent, waiting for the release
+DRAGGING = 4  # the touch moved away from where it started, sending DRAG events until the release
+
+class TouchInput:
+    def __init__(self, touch_screen, sample_rate=100, debounce_ms=30, release_ms=50, long_press_ms=500, drag_step=None):
+        self.touch_screen = touch_screen
+        self.sample_interval = 1 / sample_rate  # seconds between two touch readings
+        self.debounce_ms = debounce_ms  # how long a touch must last before it counts as a press
+        self.release_ms = release_ms  # how long the screen must stay untouched before it counts as a release
+        self.long_press_ms = long_press_ms  # how long a press must be held to become a long press
+        self.drag_step = drag_step  # distance in pixels a touch must move to send a DRAG event, None for no drags
+        self.state = IDLE
+        self.press_time = 0
+        self.release_time = None
+        self.x = 0
+        self.y = 0
+        self.press_x = 0  # position latched when the press settles, reported by TAP and LONGPRESS
+        self.press_y = 0
+        self.drag_x = 0  # position of the previous DRAG event, or of the press
+        self.drag_y = 0
+
+    # Reading the touch screen once, and advancing the state machine
+    # Returns a (TAP or LONGPRESS, x, y) or (DRAG, dx, dy) tuple when an event is detected, None otherwise
+    # Should be called about sample_rate times a second
+    def poll(self):
+        point = self.touch_screen.touch_point
+        now = ticks_ms()
+
+        if point is not None:
+            # The resistive screen is noisy at the edges of a touch, the latest position is only used for drags,
+            # taps and long presses report the position latched once the press is stable
+            self.x = point[0]
+            self.y = point[1]
+            self.release_time = None
+
+            if self.state == IDLE:
+                self.state = PRESSING
+                self.press_time = now
+            elif self.state == PRESSING:
+                if now - self.press_time >= self.debounce_ms:
+                    self.state = PRESSED
+                    self.press_x = self.x
+                    self.press_y = self.y
+                    self.drag_x = self.x
+                    self.drag_y = self.y
+            elif self.state == PRESSED:
+                if self.moved_a_drag_step():
+                    # Moving the touch turns it into a drag, it can't be a tap or a long press anymore
+                    self.state = DRAGGING
+                    return self.drag_event()
+                if now - self.press_time >= self.long_press_ms:
+                    self.state = HELD
+                    return (LONGPRESS, self.press_x, self.press_y)
+            elif self.state == DRAGGING:
+                if self.moved_a_drag_step():
+                    return self.drag_event()
+            return None
+
+        if self.state == IDLE:
+            return None
+        if self.state == PRESSING:
+            # Touch shorter than the debounce time, it's just noise
+            self.state = IDLE
+            return None
+
+        # The screen can miss a reading while still pressed, wait for the release to be stable
+        if self.release_time is None:
+            self.release_time = now
+        if now - self.release_time < self.release_ms:
+            return None
+
+        released_state = self.state
+        self.state = IDLE
+        self.release_time = None
+        if released_state == PRESSED:
+            return (TAP, self.press_x, self.press_y)
+        return None
+
+    def moved_a_drag_step(self):
+        if self.drag_step is None:
+            return False
+        return abs(self.x - self.drag_x) >= self.drag_step or abs(self.y - self.drag_y) >= self.drag_step
+
+    # DRAG event with the distance moved since the previous one
+    def drag_event(self):
+        event = (DRAG, self.x - self.drag_x, self.y - self.drag_y)
+        self.drag_x = self.x
+        self.drag_y = self.y
+        return event